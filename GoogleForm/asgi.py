@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.exceptions import ImproperlyConfigured
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GoogleForm.settings')
+# Tells the settings to drop persistent connections in favour of a pool
+os.environ.setdefault('DJANGO_ASGI', 'true')
 
 application = get_asgi_application()
+
+# Form versions and change stamps live in the cache; with a cache per worker,
+# a worker that did not handle an edit keeps serving its old data as current
+if int(os.getenv('WEB_CONCURRENCY', 1)) > 1 and settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    raise ImproperlyConfigured(
+        "Several workers need a shared cache: set CACHE_BACKEND, e.g. to "
+        "django.core.cache.backends.db.DatabaseCache, and run `manage.py createcachetable`."
+    )
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 import os
 import dj_database_url
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'forms.profiling.ProfilingMiddleware',
+    'forms.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,12 +81,40 @@ WSGI_APPLICATION = 'GoogleForm.wsgi.application'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 
+# Set by GoogleForm.asgi before the settings load
+SERVED_OVER_ASGI = os.getenv('DJANGO_ASGI', 'false').lower() in ('1', 'true', 'yes')
+# Connections are kept open for this many seconds and checked before reuse instead of opened per request;
+# not under ASGI, where a connection belongs to a thread that may not serve the next request (see Django's docs)
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', 0 if SERVED_OVER_ASGI else 60))
+# Use psycopg's connection pool instead on PostgreSQL (needs psycopg[pool]), the better fit under ASGI,
+# where it is the default when psycopg_pool is installed
+DATABASE_POOL = os.getenv(
+    'DATABASE_POOL', 'true' if SERVED_OVER_ASGI and find_spec('psycopg_pool') else 'false'
+).lower() in ('1', 'true', 'yes')
+
+
+def database(url):
+    config = dj_database_url.parse(url)
+    config.update(CONN_MAX_AGE=DATABASE_CONN_MAX_AGE, CONN_HEALTH_CHECKS=True)
+    if DATABASE_POOL and config['ENGINE'] == 'django.db.backends.postgresql':
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = True
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')
-    )
+    'default': database(os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3')),
 }
 
+# Comma separated URLs of read replicas, available as replica_1, replica_2, ...
+for number, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {**database(url.strip()), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['forms.routers.ReplicaRouter']
+# Seconds a client that wrote keeps reading from the primary
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 10))
+
 
 # DATABASES = {
 #     'default': {
@@ -104,6 +135,87 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a serialized form definition stays cached; writes invalidate it earlier
+FORMS_CACHE_TIMEOUT = int(os.getenv('FORMS_CACHE_TIMEOUT', 300))
+
+# Cache-Control of the read endpoints, which all answer conditional requests; e.g.
+# 'public, max-age=5, stale-while-revalidate=30' lets a CDN serve polls without asking
+FORMS_HTTP_CACHE_CONTROL = os.getenv('FORMS_HTTP_CACHE_CONTROL', 'no-cache')
+
+# Seconds the Swagger and ReDoc pages and the schema are cached; the schema only changes on deploys
+API_DOCS_CACHE_TIMEOUT = int(os.getenv('API_DOCS_CACHE_TIMEOUT', 3600))
+
+# 'queue' spools validated submissions for `manage.py process_submissions` and answers 202 with a receipt
+FORMS_INGEST_MODE = os.getenv('FORMS_INGEST_MODE', 'direct')
+FORMS_INGEST_BATCH_SIZE = int(os.getenv('FORMS_INGEST_BATCH_SIZE', 500))
+
+# Seconds the changes feed holds back new changes, so a cursor never passes rows of transactions still running
+FORMS_CHANGES_DELAY = int(os.getenv('FORMS_CHANGES_DELAY', 5))
+
+# Admin changelists count exactly up to this many rows and use the planner's estimate beyond (PostgreSQL)
+FORMS_ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('FORMS_ADMIN_EXACT_COUNT_LIMIT', 10000))
+
+# Server-Timing headers and a JSON log line with timings and query counts for every request;
+# a sampled share of requests is also profiled with cProfile into FORMS_PROFILING_DIR
+FORMS_PROFILING = os.getenv('FORMS_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+FORMS_PROFILING_SAMPLE_RATE = float(os.getenv('FORMS_PROFILING_SAMPLE_RATE', 0))
+FORMS_PROFILING_DIR = os.getenv('FORMS_PROFILING_DIR', BASE_DIR / 'profiles')
+
+# Token bucket limits on answer submissions per client address and per form ('<count>/<s|min|hour|day>',
+# empty to disable); buckets are per process with LocalBucketStore, shared with forms.throttling.CacheBucketStore
+FORMS_THROTTLE_STORE = os.getenv('FORMS_THROTTLE_STORE', 'forms.throttling.LocalBucketStore')
+FORMS_THROTTLE_RATES = {
+    'client': os.getenv('FORMS_THROTTLE_CLIENT_RATE', '60/min'),
+    'form': os.getenv('FORMS_THROTTLE_FORM_RATE', '6000/min'),
+}
+
+# Responses to submissions with an Idempotency-Key header are replayed to retries for this many seconds,
+# remembering up to FORMS_IDEMPOTENCY_CACHE_SIZE keys per process
+FORMS_IDEMPOTENCY_TTL = int(os.getenv('FORMS_IDEMPOTENCY_TTL', 3600))
+FORMS_IDEMPOTENCY_CACHE_SIZE = int(os.getenv('FORMS_IDEMPOTENCY_CACHE_SIZE', 10000))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'forms.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'forms.pagination.IdCursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
+    # Proxies in front of the app whose X-Forwarded-For entries are trusted to identify clients for
+    # throttling and idempotency keys; with 0 the header is ignored, as clients can set it to anything
+    'NUM_PROXIES': int(os.getenv('API_NUM_PROXIES', 0)),
+    # orjson based JSON handling, falling back to the stock classes when orjson is not installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'forms.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'forms.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
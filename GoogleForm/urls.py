@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from drf_yasg import openapi
@@ -18,7 +19,7 @@ schema_view = get_schema_view(
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('forms.urls')),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='swagger-docs'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='redoc-docs'),
+    path('swagger/', schema_view.with_ui('swagger', cache_timeout=settings.API_DOCS_CACHE_TIMEOUT), name='swagger-docs'),
+    path('redoc/', schema_view.with_ui('redoc', cache_timeout=settings.API_DOCS_CACHE_TIMEOUT), name='redoc-docs'),
 
 ]
@@ -0,0 +1,244 @@
+"""
+Latency and query budgets for the API hot paths.
+
+Not part of the regular test run; start it explicitly with::
+
+    pytest benchmarks.py
+
+Each endpoint is timed against a form seeded with ``BENCHMARK_SIZES``
+answers (comma separated, default ``1000``, e.g. ``1000,100000,1000000``).
+A run fails when an endpoint issues more queries than recorded in
+``benchmarks.json``, its median latency exceeds the recorded one by more
+than ``BENCHMARK_TOLERANCE`` (default 1.5x), or it has no baseline at that
+size. Record a new baseline with ``BENCHMARK_UPDATE=1`` after an intended
+change, on the machine that will check it.
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from forms.models import Form, Question, Answer, Submission
+from forms.renderers import FastJSONRenderer
+
+BASELINE = Path(__file__).with_name('benchmarks.json')
+SIZES = [int(size) for size in os.getenv('BENCHMARK_SIZES', '1000').split(',')]
+ITERATIONS = int(os.getenv('BENCHMARK_ITERATIONS', 200))
+TOLERANCE = float(os.getenv('BENCHMARK_TOLERANCE', 1.5))
+# Timer and scheduler noise that sub-millisecond medians are allowed on top of the tolerance
+SLACK_MS = float(os.getenv('BENCHMARK_SLACK_MS', 0.5))
+UPDATE = os.getenv('BENCHMARK_UPDATE') == '1'
+QUESTIONS = 20
+BATCH_SIZE = 5000
+
+results = {}
+
+
+def seed(size):
+    """A form of ``QUESTIONS`` questions answered ``size`` times in total, inserted in batches."""
+    form = Form.objects.create(title=f"Benchmark ({size} answers)")
+    questions = Question.objects.bulk_create(
+        Question(
+            form=form,
+            text=f"Question {i}",
+            question_type='number' if i % 2 else 'short_text',
+            max_length=100,
+            min_value=0,
+            max_value=100,
+        )
+        for i in range(QUESTIONS)
+    )
+    remaining = size
+    while remaining > 0:
+        count = min(BATCH_SIZE, remaining) // QUESTIONS or 1
+        submissions = Submission.objects.bulk_create(Submission(form=form) for _ in range(count))
+        Answer.objects.bulk_create(
+            Answer(submission=submission, question=question, numeric_answer=j % 100)
+            if question.question_type == 'number'
+            else Answer(submission=submission, question=question, text_answer=f"Answer {j}")
+            for j, submission in enumerate(submissions)
+            for question in questions
+        )
+        remaining -= count * QUESTIONS
+    return form, questions
+
+
+def unseed(form):
+    # Deleting through the ORM would run the stats signals once per answer
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {Answer._meta.db_table} WHERE question_id IN "
+            f"(SELECT id FROM {Question._meta.db_table} WHERE form_id = %s)",
+            [form.id],
+        )
+    form.delete()
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda size: f'{size}_answers')
+def seeded(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        form, questions = seed(request.param)
+        yield request.param, form, questions
+        unseed(form)
+
+
+@pytest.fixture(autouse=True)
+def unthrottled(settings):
+    # Every iteration submits from the same client
+    settings.FORMS_THROTTLE_RATES = {}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def save_baseline():
+    yield
+    if UPDATE and results:
+        baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        for size, endpoints in results.items():
+            baseline.setdefault(size, {}).update(endpoints)
+        BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+
+
+def measure(size, name, call):
+    """Time ``ITERATIONS`` calls after a warm-up call, then check the budget recorded for ``name``."""
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            call()
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100)
+    result = {
+        'queries': max(len(queries), len(captured)),
+        'p50_ms': round(quantiles[49] * 1000, 3),
+        'p99_ms': round(quantiles[98] * 1000, 3),
+        'requests_per_second': round(ITERATIONS / elapsed, 1),
+    }
+    results.setdefault(str(size), {})[name] = result
+    print(
+        f"{name} @ {size}: {result['requests_per_second']} req/s, p50 {result['p50_ms']} ms, "
+        f"p99 {result['p99_ms']} ms, {result['queries']} queries"
+    )
+
+    if UPDATE:
+        return
+    budget = json.loads(BASELINE.read_text()).get(str(size), {}).get(name) if BASELINE.exists() else None
+    # A size without a budget would pass unchecked
+    if budget is None:
+        pytest.fail(f"No baseline for {name} at {size} answers, record one with BENCHMARK_UPDATE=1")
+    assert result['queries'] <= budget['queries'], f"{name} now issues {result['queries']} queries"
+    assert result['p50_ms'] <= budget['p50_ms'] * TOLERANCE + SLACK_MS, (
+        f"{name} median went from {budget['p50_ms']} ms to {result['p50_ms']} ms"
+    )
+
+
+@pytest.mark.django_db
+def test_retrieve_form(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+
+    def call():
+        assert client.get(f'/api/forms/{form.id}/').status_code == status.HTTP_200_OK
+
+    measure(size, 'forms.retrieve', call)
+
+
+@pytest.mark.django_db
+def test_form_questions(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+
+    def call():
+        assert client.get(f'/api/forms/{form.id}/questions/').status_code == status.HTTP_200_OK
+
+    measure(size, 'forms.questions', call)
+
+
+@pytest.mark.django_db
+def test_create_answer(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+    payload = {'question': questions[1].id, 'numeric_answer': 42}
+
+    def call():
+        assert client.post('/api/answers/', payload, format='json').status_code == status.HTTP_201_CREATED
+
+    measure(size, 'answers.create', call)
+
+
+@pytest.mark.django_db
+def test_bulk_answers(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+    payload = {
+        'form': form.id,
+        'answers': [
+            {'question': question.id, 'numeric_answer': 42}
+            if question.question_type == 'number'
+            else {'question': question.id, 'text_answer': "Answer"}
+            for question in questions
+        ],
+    }
+
+    def call():
+        assert client.post('/api/answers/bulk/', payload, format='json').status_code == status.HTTP_201_CREATED
+
+    measure(size, 'answers.bulk', call)
+
+
+@pytest.mark.django_db
+def test_list_answers(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+
+    def call():
+        assert client.get('/api/answers/').status_code == status.HTTP_200_OK
+
+    measure(size, 'answers.list', call)
+
+
+@pytest.mark.django_db
+def test_list_submissions(seeded):
+    size, form, questions = seeded
+    client = APIClient()
+
+    def call():
+        assert client.get(f'/api/forms/{form.id}/submissions/').status_code == status.HTTP_200_OK
+
+    measure(size, 'forms.submissions', call)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name, path', [
+    ('answers', '/api/answers/?page_size=1000'),
+    ('questions', '/api/forms/{form}/questions/?page_size=1000'),
+])
+def test_json_renderers(seeded, name, path):
+    """The orjson renderer against the stock one on real payloads, which both must render alike."""
+    size, form, questions = seeded
+    data = APIClient().get(path.format(form=form.id)).data
+    stock, fast = JSONRenderer(), FastJSONRenderer()
+    assert fast.render(data) == stock.render(data)
+    # Floats that need an exponent are spelled differently, but must parse alike
+    results = [
+        {**item, 'numeric_answer': value}
+        for item, value in zip(data['results'], (1e16, -1e22, 1.5e300, 1e-05, -2.5e-07, 5e-324))
+    ]
+    extreme = {**data, 'results': results}
+    assert json.loads(fast.render(extreme)) == json.loads(stock.render(extreme))
+
+    measure(size, f'render.{name}.stock', lambda: stock.render(data))
+    measure(size, f'render.{name}.fast', lambda: fast.render(data))
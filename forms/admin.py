@@ -1,6 +1,77 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
 from django.core.exceptions import ValidationError
-from .models import Form, Question, Answer
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .models import Form, Question, Answer, Submission
+from .validation import get_validator
+
+
+def estimate_count(queryset):
+    """The planner's row estimate for ``queryset`` on PostgreSQL, otherwise ``None``."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to ``FORMS_ADMIN_EXACT_COUNT_LIMIT`` rows and estimates beyond.
+
+    The exact count stops scanning at the limit, so small or well filtered
+    changelists stay exact while a huge table costs one planner estimate
+    instead of a full ``COUNT(*)``.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, 'FORMS_ADMIN_EXACT_COUNT_LIMIT', 10000)
+        count = self.object_list.order_by()[:limit + 1].count()
+        if count <= limit:
+            return count
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            return self.object_list.count()
+        return max(estimate, count)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables too large to count or scan.
+
+    Search only matches ids against indexed columns, listed in
+    ``id_search_fields``, and the total row count is never shown.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    id_search_fields = ('id',)
+    search_fields = ('id',)
+
+    @property
+    def search_help_text(self):
+        return f"Search by {', '.join(field.replace('_', ' ') for field in self.id_search_fields)}."
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if not search_term.isdigit():
+            return queryset.none(), False
+        term = Q()
+        for field in self.id_search_fields:
+            term |= Q(**{field: int(search_term)})
+        return queryset.filter(term), False
 
 
 class FormAdmin(admin.ModelAdmin):
@@ -14,11 +85,14 @@ class FormAdmin(admin.ModelAdmin):
         return obj.title
 
 
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(LargeTableAdmin):
     list_display = (
-        'text', 'form', 'question_type', 'required', 'max_length', 'min_value', 'max_value', 'allow_decimal')
-    search_fields = ('text', 'form__title')
-    list_filter = ('form', 'question_type', 'required')
+        'id', 'text', 'form', 'question_type', 'required', 'max_length', 'min_value', 'max_value', 'allow_decimal')
+    list_select_related = ('form',)
+    # Filter by form with ?form__id__exact=, a sidebar listing every form does not scale
+    id_search_fields = ('id', 'form_id')
+    list_filter = ('question_type', 'required')
+    autocomplete_fields = ('form',)
 
     # Custom validation for Question model
     def clean(self, obj):
@@ -35,66 +109,38 @@ class QuestionAdmin(admin.ModelAdmin):
         return obj
 
 
-class AnswerAdmin(admin.ModelAdmin):
-    list_display = ('question', 'text_answer', 'numeric_answer', 'email_answer')
-    search_fields = ('question__text', 'text_answer', 'numeric_answer', 'email_answer')
-    list_filter = ('question',)
+class SubmissionAdmin(LargeTableAdmin):
+    list_display = ('id', 'form', 'respondent', 'created_at')
+    list_select_related = ('form',)
+    id_search_fields = ('id', 'form_id')
+    autocomplete_fields = ('form',)
 
-    def save_model(self, request, obj, form, change):
-        # Validation: Ensure only one type of answer is provided
-        provided_answers = [
-            bool(obj.text_answer),
-            bool(obj.numeric_answer),
-            bool(obj.email_answer)
-        ]
-
-        if sum(provided_answers) > 1:
-            self.message_user(request, "Error: Only one type of answer can be provided for a single question.", level="error")
-            return
 
-        # Validation: Ensure numeric answer is within range for number type questions
-        if obj.question.question_type == 'number':
-            if obj.numeric_answer is not None:
-                if obj.question.min_value is not None and obj.numeric_answer < obj.question.min_value:
-                    self.message_user(
-                        request,
-                        f"Error: Numeric answer must be greater than or equal to {obj.question.min_value}.",
-                        level="error"
-                    )
-                    return
-
-                if obj.question.max_value is not None and obj.numeric_answer > obj.question.max_value:
-                    self.message_user(
-                        request,
-                        f"Error: Numeric answer must be less than or equal to {obj.question.max_value}.",
-                        level="error"
-                    )
-                    return
-
-        # Validation: Ensure email answer is provided for email type questions
-        if obj.question.question_type == 'email' and not obj.email_answer:
-            self.message_user(request, "Error: An email answer is required for email type questions.", level="error")
-            return
+class AnswerAdmin(LargeTableAdmin):
+    list_display = ('id', 'submission', 'question', 'text_answer', 'numeric_answer', 'email_answer')
+    list_select_related = ('submission__form', 'question')
+    # Filter by question with ?question__id__exact=, a sidebar listing every question does not scale
+    id_search_fields = ('id', 'submission_id', 'question_id')
+    autocomplete_fields = ('question',)
+    raw_id_fields = ('submission',)
 
-        # Validation: Ensure text answer length is within max_length for short_text and long_text questions
-        if obj.question.question_type in ['short_text', 'long_text']:
-            if obj.text_answer and len(obj.text_answer) > obj.question.max_length:
-                self.message_user(
-                    request,
-                    f"Error: Text answer cannot exceed {obj.question.max_length} characters.",
-                    level="error"
-                )
-                return
-
-        # Prevent duplicate answers for the same question
-        if not change and Answer.objects.filter(question=obj.question).exists():
-            self.message_user(request, "Error: An answer already exists for this question.", level="error")
+    def save_model(self, request, obj, form, change):
+        # Same rules and messages as the API
+        try:
+            get_validator(obj.question).validate(obj.text_answer, obj.numeric_answer, obj.email_answer)
+        except ValidationError as exc:
+            self.message_user(request, f"Error: {exc.messages[0]}", level="error")
             return
 
-        # Save the object if all validations pass
-        super().save_model(request, obj, form, change)
+        # Save the object if all validations pass; the unique constraint prevents duplicate answers
+        try:
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+        except IntegrityError:
+            self.message_user(request, "Error: This submission already answers this question.", level="error")
 
 
 admin.site.register(Form, FormAdmin)
 admin.site.register(Question, QuestionAdmin)
+admin.site.register(Submission, SubmissionAdmin)
 admin.site.register(Answer, AnswerAdmin)
@@ -0,0 +1,112 @@
+"""
+Archival of closed forms' responses into compressed batches.
+
+``archive_form`` moves the submissions and answers of a closed form, a
+batch at a time, into ``ResponseArchive`` rows of gzipped JSON Lines and
+deletes them from the hot tables, so those tables and their indexes only
+hold forms still collecting responses. The answer summaries are kept as
+they are, and exports read the archive before the hot rows, so the stats
+and export endpoints return the same data as before archiving. Archived
+responses are no longer served one by one, nor listed in the changes feed.
+"""
+import gzip
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import bump_form_version
+from .conditional import bump_stamp
+from .models import Answer, Form, QueuedSubmission, ResponseArchive, Submission
+
+ANSWER_FIELDS = ('submission_id', 'question_id', 'text_answer', 'numeric_answer', 'email_answer')
+
+
+def _delete(model, column, ids, using):
+    # Deleting through the ORM would run the stats and tombstone signals once per row
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {model._meta.db_table} WHERE {column} IN ({', '.join(['%s'] * len(ids))})", ids
+        )
+
+
+def archive_batch(form, batch_size):
+    """
+    Archive the ``batch_size`` oldest hot submissions of ``form`` in one transaction.
+
+    Returns the number of submissions and answers archived.
+    """
+    using = Submission.objects.db
+    with transaction.atomic(using=using):
+        submissions = list(
+            Submission.objects.filter(form=form).order_by('id')
+            .values('id', 'respondent', 'created_at', 'version_id')[:batch_size]
+        )
+        if not submissions:
+            return 0, 0
+        ids = [submission['id'] for submission in submissions]
+        answers = (
+            Answer.objects.filter(submission_id__in=ids).order_by('submission_id', 'question_id')
+            .values_list(*ANSWER_FIELDS)
+        )
+        by_submission = {
+            submission_id: [values for _, *values in rows]
+            for submission_id, rows in groupby(answers, key=itemgetter(0))
+        }
+        lines = [
+            json.dumps({
+                'id': submission['id'],
+                'respondent': submission['respondent'],
+                'created_at': submission['created_at'].isoformat(),
+                'version': submission['version_id'],
+                'answers': by_submission.get(submission['id'], []),
+            }) + '\n'
+            for submission in submissions
+        ]
+        answer_count = sum(len(rows) for rows in by_submission.values())
+        ResponseArchive.objects.create(
+            form=form, first_submission=ids[0], last_submission=ids[-1], submission_count=len(ids),
+            answer_count=answer_count, data=gzip.compress(''.join(lines).encode()),
+        )
+        QueuedSubmission.objects.filter(submission_id__in=ids).update(submission=None)
+        _delete(Answer, 'submission_id', ids, using)
+        _delete(Submission, 'id', ids, using)
+        Form.objects.filter(pk=form.pk).update(
+            archived_responses=F('archived_responses') + len(ids), updated_at=timezone.now()
+        )
+    return len(ids), answer_count
+
+
+def archive_form(form, batch_size=1000):
+    """
+    Archive every hot response to the closed ``form``.
+
+    Responses that reach the form after it was archived, such as queued
+    submissions processed late, are archived by the next run. Returns the
+    number of submissions and answers archived.
+    """
+    total_submissions = total_answers = 0
+    while True:
+        submissions, answers = archive_batch(form, batch_size)
+        if not submissions:
+            break
+        total_submissions += submissions
+        total_answers += answers
+    if total_submissions:
+        bump_form_version(form.pk)
+        bump_stamp('answer')
+    return total_submissions, total_answers
+
+
+def iter_archived(form_ids, using=None):
+    """Yield the archived submissions of ``form_ids`` as dicts, form by form in submission order."""
+    archives = (
+        ResponseArchive.objects.using(using).filter(form_id__in=form_ids).order_by('form_id', 'first_submission')
+        .values_list('data', flat=True).iterator(chunk_size=10)
+    )
+    for data in archives:
+        for line in gzip.decompress(bytes(data)).splitlines():
+            yield json.loads(line)
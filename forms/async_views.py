@@ -0,0 +1,107 @@
+"""
+Async-native endpoints for the hot paths under an ASGI server.
+
+They are plain Django views, since DRF views are sync only, and reuse the
+serializers and validation of the sync API so both return the same
+payloads and errors. Database access goes through the async ORM, so a
+slow client never holds a worker thread while its request is waiting.
+"""
+import json
+from math import ceil
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import ValidationError
+
+from . import idempotency
+from .cache import acached_form_response
+from .ingest import aenqueue, queue_enabled, receipt_location
+from .models import Form, FormVersion, Question
+from .routers import replica_reads
+from .serializers import (
+    CLOSED_FORM_ERROR, AnswerSerializer, BulkAnswerItemSerializer, BulkAnswerSerializer, FormSerializer,
+    QuestionSerializer, ReceiptSerializer, save_submission, validate_submission
+)
+from .throttling import asubmission_wait
+from .versions import version_questions
+
+
+@replica_reads
+@require_GET
+async def form_definition(request, pk):
+    """A form with all of its questions, from the same cache as the sync API."""
+    async def build():
+        try:
+            form = await Form.objects.aget(pk=pk)
+        except Form.DoesNotExist:
+            raise Http404('No Form matches the given query.')
+        # The related manager hands every question the already loaded form
+        questions = [question async for question in form.questions.order_by('id')]
+        return {**FormSerializer(form).data, 'questions': QuestionSerializer(questions, many=True).data}
+
+    return await acached_form_response(request, pk, 'async-definition', build)
+
+
+@csrf_exempt
+@require_POST
+async def submit_answers(request):
+    """Async counterpart of ``POST /api/answers/bulk/``, throttled and idempotent alike."""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = None
+    wait = await asubmission_wait(request, data)
+    if wait:
+        return JsonResponse({'detail': f'Request was throttled. Expected available in {ceil(wait)} seconds.'},
+                            status=429, headers={'Retry-After': str(ceil(wait))})
+    # The idempotency keys are in the memory of this process, so checking them never blocks
+    key, reply = idempotency.begin(request, data)
+    if reply is None:
+        try:
+            reply = await _submit(request, data)
+        except BaseException:
+            idempotency.finish(key, data, 500, None, {})
+            raise
+        idempotency.finish(key, data, *reply)
+    status, body, headers = reply
+    return JsonResponse(body, status=status, headers=headers, safe=False)
+
+
+async def _submit(request, data):
+    try:
+        form_id = int(data['form'])
+        try:
+            respondent = BulkAnswerSerializer().fields['respondent'].run_validation(data.get('respondent', ''))
+        except ValidationError as exc:
+            raise ValidationError({'respondent': exc.detail})
+        answers = BulkAnswerItemSerializer(data=data['answers'], many=True, allow_empty=False)
+        if not answers.is_valid():
+            raise ValidationError({'answers': answers.errors})
+        form = await Form.objects.filter(pk=form_id).values_list('closed_at').afirst()
+        if form is None:
+            raise ValidationError({'form': f'Invalid pk "{form_id}" - object does not exist.'})
+        if form[0] is not None:
+            raise ValidationError({'form': CLOSED_FORM_ERROR})
+        version = None
+        if data.get('version') is not None:
+            version = await FormVersion.objects.filter(pk=int(data['version']), form_id=form_id).afirst()
+            if version is None:
+                raise ValidationError({'version': 'This form has no such version.'})
+        questions = {question.id: question async for question in Question.objects.filter(form_id=form_id)}
+        validate_submission(questions, answers.validated_data, version and version_questions(version))
+        version_id = version and version.id
+        if queue_enabled():
+            submission = await aenqueue(form_id, answers.validated_data, respondent, version_id=version_id)
+            return 202, ReceiptSerializer(submission).data, {'Location': receipt_location(request, submission)}
+        # The inserts and the summary update share a transaction, which the
+        # async ORM cannot open, so they run together in one thread hop
+        created = await sync_to_async(save_submission)(
+            form_id, answers.validated_data, respondent, version_id=version_id
+        )
+    except (ValueError, TypeError, KeyError):
+        return 400, {'detail': 'Expected a JSON object with "form" and "answers".'}, {}
+    except ValidationError as exc:
+        return 400, exc.detail, {}
+    return 201, AnswerSerializer(created, many=True).data, {}
@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .routers import primary_reads_after
+
+
+def get_cache():
+    return caches[getattr(settings, 'FORMS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(form_id):
+    return f'forms:form:{form_id}:version'
+
+
+def get_form_version(form_id):
+    """
+    Return the version stamp of a form definition.
+
+    The stamp is the time (in nanoseconds) of the last change to the form or
+    one of its questions. It is created lazily, so a cold cache simply starts
+    a new version.
+    """
+    cache = get_cache()
+    key = _version_key(form_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_form_version(form_id):
+    """Async counterpart of ``get_form_version``."""
+    cache = get_cache()
+    key = _version_key(form_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_form_version(form_id):
+    """Invalidate every cached payload of a form by starting a new version."""
+    get_cache().set(_version_key(form_id), time.time_ns(), None)
+
+
+def _revalidate(request, form_id, version, name):
+    """
+    Return the cache key and validator headers of a form payload.
+
+    The third item is a ready 304 response when the client's copy is fresh.
+    """
+    path = request.get_full_path()
+    digest = hashlib.md5(f'{form_id}:{version}:{path}'.encode(), usedforsecurity=False).hexdigest()
+    etag = f'W/"{digest}"'
+    last_modified = version // 1_000_000_000
+
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': settings.FORMS_HTTP_CACHE_CONTROL,
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+    key = f'forms:form:{form_id}:{version}:{name}:{digest}'
+    return key, headers, not_modified
+
+
+def cached_form_response(request, form_id, name, build):
+    """
+    Serve a form payload from the cache, answering conditional GETs with 304.
+
+    ``build`` is only called on a cache miss and must return the serialized
+    data. The ETag and Last-Modified validators are derived from the version
+    stamp, so a 304 never touches the database or the cached payload, and
+    the payload of a recent version is built from the primary.
+    """
+    version = get_form_version(form_id)
+    key, headers, not_modified = _revalidate(request, form_id, version, name)
+    if not_modified is not None:
+        return not_modified
+
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        with primary_reads_after(version):
+            data = build()
+        cache.set(key, data, getattr(settings, 'FORMS_CACHE_TIMEOUT', 300))
+    return Response(data, headers=headers)
+
+
+async def acached_form_response(request, form_id, name, build):
+    """
+    Async counterpart of ``cached_form_response`` for plain Django views.
+
+    ``build`` is a coroutine function and the payload is returned as a
+    ``JsonResponse``.
+    """
+    version = await aget_form_version(form_id)
+    key, headers, not_modified = _revalidate(request, form_id, version, name)
+    if not_modified is not None:
+        return not_modified
+
+    cache = get_cache()
+    data = await cache.aget(key)
+    if data is None:
+        with primary_reads_after(version):
+            data = await build()
+        await cache.aset(key, data, getattr(settings, 'FORMS_CACHE_TIMEOUT', 300))
+    return JsonResponse(data, headers=headers)
@@ -0,0 +1,99 @@
+"""
+The changes feed: forms, questions and answers modified after a cursor.
+
+Rows come from the ``(updated_at, id)`` index of each table and deleted
+rows from their tombstones, merged in order of time, then table, then id.
+A cursor is the position of the last change returned, so every page costs
+one keyset query per table, however large the tables are. Changes younger
+than ``FORMS_CHANGES_DELAY`` seconds are held back: a transaction still
+open may commit rows stamped before them, which a cursor would have passed.
+"""
+import base64
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Answer, Form, Question, Tombstone
+
+MODELS = {'form': Form, 'question': Question, 'answer': Answer}
+# Order of the sources within one timestamp
+TOMBSTONES = len(MODELS)
+
+
+def encode_cursor(position):
+    time, rank, pk = position
+    return base64.urlsafe_b64encode(f'{time.isoformat()}|{rank}|{pk}'.encode()).decode()
+
+
+def decode_cursor(value):
+    """
+    The position a ``since`` value stands for.
+
+    Besides cursors of the feed, an ISO 8601 date and time starts with the
+    changes made at that time. Raises ``ValueError`` for anything else.
+    """
+    time = parse_datetime(value)
+    if time is not None:
+        return (timezone.make_aware(time) if timezone.is_naive(time) else time), -1, 0
+    try:
+        time, rank, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        time = parse_datetime(time)
+        rank, pk = int(rank), int(pk)
+    except (ValueError, UnicodeError):
+        raise ValueError(value)
+    if time is None:
+        raise ValueError(value)
+    return time, rank, pk
+
+
+def _after(position, rank, field):
+    """Rows of source ``rank`` past ``position`` in the feed order, ``field`` being their time."""
+    if position is None:
+        return Q()
+    time, after_rank, after_pk = position
+    if rank > after_rank:
+        return Q(**{f'{field}__gte': time})
+    if rank < after_rank:
+        return Q(**{f'{field}__gt': time})
+    return Q(**{f'{field}__gt': time}) | Q(**{field: time, 'id__gt': after_pk})
+
+
+def _rows(name, rank, position, until, limit):
+    rows = (
+        MODELS[name].objects.filter(_after(position, rank, 'updated_at'), updated_at__lte=until)
+        .order_by('updated_at', 'id').values()[:limit]
+    )
+    for row in rows:
+        yield {
+            'position': (row['updated_at'], rank, row['id']), 'type': name, 'id': row['id'],
+            'updated_at': row['updated_at'], 'deleted': False, 'data': row,
+        }
+
+
+def _tombstones(position, until, limit):
+    tombstones = (
+        Tombstone.objects.filter(_after(position, TOMBSTONES, 'deleted_at'), deleted_at__lte=until)
+        .order_by('deleted_at', 'id').values()[:limit]
+    )
+    for row in tombstones:
+        yield {
+            'position': (row['deleted_at'], TOMBSTONES, row['id']), 'type': row['model'], 'id': row['object_id'],
+            'updated_at': row['deleted_at'], 'deleted': True, 'data': None,
+        }
+
+
+def changes_since(position, limit):
+    """
+    Up to ``limit`` changes after ``position`` (``None`` for all of them), oldest first.
+
+    Each change carries its own ``position`` to resume from.
+    """
+    until = timezone.now() - timedelta(seconds=settings.FORMS_CHANGES_DELAY)
+    sources = [_rows(name, rank, position, until, limit) for rank, name in enumerate(MODELS)]
+    sources.append(_tombstones(position, until, limit))
+    return list(islice(heapq.merge(*sources, key=lambda change: change['position']), limit))
@@ -0,0 +1,100 @@
+"""
+Conditional GETs for the list and detail endpoints.
+
+Every model has a change stamp in the cache, the time (in nanoseconds) of
+the last save or delete of one of its rows, bumped by the signal handlers.
+Rows added with ``bulk_create`` skip the signals, so list responses also
+depend on the newest primary key, one index lookup. A response's ETag is
+derived from those and the request, so a client or CDN revalidating an
+unchanged response gets a 304 without the queryset or serializer running.
+Responses to recent stamps are built from the primary, as a replica may
+not have the change yet and its data would carry the new ETag.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_cache
+from .routers import primary_reads_after
+
+CONDITIONAL_STATUSES = (200, 304)
+
+
+def _stamp_key(name):
+    return f'forms:stamp:{name}'
+
+
+def get_stamps(names):
+    """The change stamps of the models ``names``, created lazily like form versions."""
+    cache = get_cache()
+    keys = [_stamp_key(name) for name in names]
+    stamps = cache.get_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        stamps.update(cache.get_many(missing))
+    return tuple(stamps[key] for key in keys)
+
+
+def bump_stamp(name):
+    """Mark every response depending on model ``name`` as changed."""
+    get_cache().set(_stamp_key(name), time.time_ns(), None)
+
+
+def conditional_response(request, state, build, changed_at, last_modified=None):
+    """
+    Answer ``If-None-Match`` and ``If-Modified-Since`` from ``state`` alone.
+
+    ``state`` is anything whose string changes whenever the response would,
+    ``changed_at`` the newest stamp in it, and ``last_modified`` a timestamp
+    only if every change moves it forward. ``build`` is only called when the
+    client's copy is stale. Successful responses get the validators and
+    ``FORMS_HTTP_CACHE_CONTROL``.
+    """
+    digest = hashlib.md5(
+        f'{request.get_full_path()}:{request.accepted_media_type}:{state}'.encode(), usedforsecurity=False
+    ).hexdigest()
+    headers = {'ETag': f'W/"{digest}"', 'Cache-Control': settings.FORMS_HTTP_CACHE_CONTROL}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    response = get_conditional_response(request, etag=headers['ETag'], last_modified=last_modified)
+    if response is None:
+        with primary_reads_after(changed_at):
+            response = build()
+    if response.status_code in CONDITIONAL_STATUSES:
+        for header, value in headers.items():
+            response[header] = value
+    return response
+
+
+class ConditionalMixin:
+    """
+    Viewset mixin answering conditional ``list`` and ``retrieve`` requests.
+
+    ``stamps`` names the models whose rows the responses show, nested ones
+    included. Lists also depend on the newest primary key of the queryset;
+    they carry no ``Last-Modified``, since new rows do not bump a stamp.
+    """
+    stamps = ()
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            return super(ConditionalMixin, self).list(request, *args, **kwargs)
+
+        last_pk = self.filter_queryset(self.get_queryset()).order_by().aggregate(last=Max('pk'))['last']
+        stamps = get_stamps(self.stamps)
+        return conditional_response(request, (stamps, last_pk), build, max(stamps))
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            return super(ConditionalMixin, self).retrieve(request, *args, **kwargs)
+
+        stamps = get_stamps(self.stamps)
+        return conditional_response(request, stamps, build, max(stamps), last_modified=max(stamps) // 1_000_000_000)
@@ -0,0 +1,145 @@
+"""
+``Idempotency-Key`` support for answer submissions.
+
+The response to a request carrying the header is remembered under the key,
+the client address and the path. A retry is then answered from memory
+without reaching the database, marked with ``Idempotent-Replayed: true``.
+A retry arriving while the first request is still running gets 409, and
+reusing a key for a different body gets 422. Error responses are not
+remembered, so a retry after fixing the request or waiting out a limit
+runs again. Keys live in a bounded LRU in the memory of each process,
+for ``FORMS_IDEMPOTENCY_TTL`` seconds.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Set while the first request with a key is running
+PENDING = object()
+
+
+class IdempotencyCache:
+    """Recent responses by key, the least recently used dropped beyond ``max_size``."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """
+        Reserve ``key`` for a new request and return ``None``.
+
+        If the key is taken, return what it holds instead: ``PENDING`` or
+        the ``(fingerprint, status, data, headers)`` of its response.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._set(key, PENDING, now)
+        return None
+
+    def store(self, key, response):
+        with self._lock:
+            self._set(key, response, time.monotonic())
+
+    def release(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _set(self, key, value, now):
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def get_idempotency_cache(max_size, ttl):
+    return IdempotencyCache(max_size, ttl)
+
+
+def _cache():
+    return get_idempotency_cache(settings.FORMS_IDEMPOTENCY_CACHE_SIZE, settings.FORMS_IDEMPOTENCY_TTL)
+
+
+def fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def begin(request, data):
+    """
+    Look up the ``Idempotency-Key`` of ``request``.
+
+    Returns ``(key, None)`` when the request should run, with ``key`` to
+    pass to ``finish`` (``None`` without the header), or ``(None, reply)``
+    with the ``(status, data, headers)`` to answer right away.
+    """
+    value = request.headers.get(HEADER)
+    if not value:
+        return None, None
+    if len(value) > MAX_KEY_LENGTH:
+        return None, (status.HTTP_400_BAD_REQUEST,
+                      {'detail': f'{HEADER} cannot be longer than {MAX_KEY_LENGTH} characters.'}, {})
+    key = (BaseThrottle().get_ident(request), request.path, value)
+    digest = fingerprint(data)
+    entry = _cache().claim(key)
+    if entry is None:
+        return key, None
+    if entry is PENDING:
+        return None, (status.HTTP_409_CONFLICT,
+                      {'detail': f'A request with this {HEADER} is still being processed.'}, {})
+    if entry[0] != digest:
+        return None, (status.HTTP_422_UNPROCESSABLE_ENTITY,
+                      {'detail': f'This {HEADER} was used with a different request body.'}, {})
+    _, status_code, data, headers = entry
+    return None, (status_code, data, {**headers, 'Idempotent-Replayed': 'true'})
+
+
+def finish(key, request_data, status_code, data, headers):
+    """Remember the response to the request that claimed ``key``, unless it is an error a retry may not get."""
+    if key is None:
+        return
+    if status_code >= status.HTTP_400_BAD_REQUEST:
+        _cache().release(key)
+    else:
+        _cache().store(key, (fingerprint(request_data), status_code, data, headers))
+
+
+def idempotent(method):
+    """Make a DRF view method honour ``Idempotency-Key``, see the module docstring."""
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key, reply = begin(request, request.data)
+        if reply is not None:
+            status_code, data, headers = reply
+            return Response(data, status=status_code, headers=headers)
+        try:
+            response = method(self, request, *args, **kwargs)
+        except BaseException:
+            if key is not None:
+                _cache().release(key)
+            raise
+        headers = {name: response[name] for name in ('Location',) if response.has_header(name)}
+        finish(key, request.data, response.status_code, response.data, headers)
+        return response
+
+    return wrapper
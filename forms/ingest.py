@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import Question, QueuedSubmission, Submission
+from .serializers import ReceiptSerializer, save_submission
+
+
+def queue_enabled():
+    """Whether validated submissions are spooled instead of written right away."""
+    return getattr(settings, 'FORMS_INGEST_MODE', 'direct') == 'queue'
+
+
+def _payload(form_id, items, respondent, submission_id, version_id):
+    return {
+        'form': form_id,
+        'respondent': respondent,
+        'submission': submission_id,
+        'version': version_id,
+        'answers': [
+            {
+                'question_id': item['question'].id,
+                'text_answer': item.get('text_answer', ''),
+                'numeric_answer': item.get('numeric_answer'),
+                'email_answer': item.get('email_answer'),
+            }
+            for item in items
+        ],
+    }
+
+
+def enqueue(form_id, items, respondent='', submission_id=None, version_id=None):
+    """Spool validated answer ``items`` and return the receipt, see ``save_submission``."""
+    return QueuedSubmission.objects.create(payload=_payload(form_id, items, respondent, submission_id, version_id))
+
+
+async def aenqueue(form_id, items, respondent='', submission_id=None, version_id=None):
+    """Async counterpart of ``enqueue``."""
+    return await QueuedSubmission.objects.acreate(
+        payload=_payload(form_id, items, respondent, submission_id, version_id)
+    )
+
+
+def receipt_location(request, submission):
+    return request.build_absolute_uri(reverse('receipt-detail', kwargs={'receipt': submission.receipt}))
+
+
+def receipt_response(request, submission):
+    """``202 Accepted`` pointing the client at the receipt to poll."""
+    return Response(ReceiptSerializer(submission).data, status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': receipt_location(request, submission)})
+
+
+def drain(batch_size=None):
+    """
+    Write the oldest pending submissions to ``Answer`` in one transaction.
+
+    Each submission gets its own savepoint, so a question or submission
+    deleted in the meantime or a repeated answer in an existing submission
+    fails that submission alone. Returns the number of submissions processed.
+    """
+    batch_size = batch_size or getattr(settings, 'FORMS_INGEST_BATCH_SIZE', 500)
+    with transaction.atomic():
+        batch = list(
+            QueuedSubmission.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('id')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        question_ids = {item['question_id'] for queued in batch for item in queued.payload['answers']}
+        existing = set(Question.objects.filter(id__in=question_ids).values_list('id', flat=True))
+        # Foreign keys are only checked on commit, past the savepoints, so a
+        # submission deleted since it was queued has to be caught up front
+        submission_ids = {queued.payload['submission'] for queued in batch} - {None}
+        live = set(Submission.objects.filter(id__in=submission_ids).values_list('id', flat=True))
+
+        now = timezone.now()
+        for queued in batch:
+            payload = queued.payload
+            missing = sorted({item['question_id'] for item in payload['answers']} - existing)
+            try:
+                if missing:
+                    raise ValidationError(f"Questions {missing} no longer exist.")
+                if payload['submission'] is not None and payload['submission'] not in live:
+                    raise ValidationError(f"Submission {payload['submission']} no longer exists.")
+                # Submissions spooled before versions existed have no 'version'
+                answers = save_submission(payload['form'], payload['answers'], payload['respondent'],
+                                          payload['submission'], payload.get('version'))
+            except IntegrityError:
+                queued.status = 'failed'
+                queued.errors = ["An answer already exists for this question."]
+            except ValidationError as exc:
+                queued.status = 'failed'
+                queued.errors = exc.detail
+            else:
+                queued.status = 'done'
+                queued.submission_id = answers[0].submission_id
+                queued.answers = [answer.id for answer in answers]
+            queued.processed_at = now
+
+        QueuedSubmission.objects.bulk_update(batch, ['status', 'submission', 'answers', 'errors', 'processed_at'])
+    return len(batch)
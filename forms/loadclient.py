@@ -0,0 +1,57 @@
+"""
+The HTTP client of the load generating commands.
+
+``loadtest`` and ``loadgen`` drive a running server over plain asyncio
+connections, a fresh one per request, so no HTTP library is needed and the
+timings include connection setup like a real respondent's would.
+"""
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+from django.core.management.base import CommandError
+
+# The submission endpoints, by the name the commands take
+ENDPOINTS = {
+    'sync': '/api/answers/bulk/',
+    'async': '/api/async/answers/bulk/',
+}
+
+
+def server_address(url):
+    """The host and port of a plain ``http://`` base URL."""
+    target = urlsplit(url)
+    if target.scheme != 'http' or not target.hostname:
+        raise CommandError("--url must be a plain http:// URL.")
+    return target.hostname, target.port or 80
+
+
+async def http_request(host, port, method, path, payload=None, headers=None, slow_ms=0):
+    """
+    Send one request over a fresh HTTP/1.1 connection and return its status code and body.
+
+    With ``slow_ms`` the body is sent in 64 byte chunks with a pause between
+    them, like a respondent on a poor mobile connection.
+    """
+    body = json.dumps(payload).encode() if payload is not None else b''
+    head = f'{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n'
+    if payload is not None:
+        head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+    for name, value in (headers or {}).items():
+        head += f'{name}: {value}\r\n'
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(head.encode() + b'\r\n')
+        if slow_ms:
+            for start in range(0, len(body), 64):
+                writer.write(body[start:start + 64])
+                await writer.drain()
+                await asyncio.sleep(slow_ms / 1000)
+        else:
+            writer.write(body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status_line, _, rest = response.partition(b'\r\n')
+    return int(status_line.split()[1]), rest.partition(b'\r\n\r\n')[2]
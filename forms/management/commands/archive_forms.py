@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from forms.archive import archive_form
+from forms.models import Form
+
+
+class Command(BaseCommand):
+    help = "Move the responses of closed forms out of the hot tables into compressed archive batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, action='append', dest='forms', help="Only archive this form.")
+        parser.add_argument('--closed-days', type=int, default=0,
+                            help="Only archive forms closed at least this many days ago.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Submissions per archive batch.")
+
+    def handle(self, *args, forms=None, closed_days=0, batch_size=1000, **options):
+        candidates = Form.objects.filter(closed_at__lte=timezone.now() - timedelta(days=closed_days)).order_by('id')
+        if forms:
+            open_forms = Form.objects.filter(id__in=forms, closed_at__isnull=True).values_list('id', flat=True)
+            if open_forms:
+                raise CommandError(f"Close forms {', '.join(map(str, open_forms))} before archiving them.")
+            candidates = candidates.filter(id__in=forms)
+
+        total_submissions = total_answers = 0
+        for form in candidates:
+            submissions, answers = archive_form(form, batch_size)
+            if submissions:
+                self.stdout.write(f"Form {form.id}: archived {submissions} submissions with {answers} answers")
+            total_submissions += submissions
+            total_answers += answers
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total_submissions} submissions with {total_answers} answers."
+        ))
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from forms.loadclient import ENDPOINTS, http_request, server_address
+from forms.seeding import random_answer
+
+
+class Traffic:
+    """
+    Respondents loading a form, thinking, then submitting valid answers to it.
+
+    Submissions carry an ``Idempotency-Key``, and ``retry_rate`` of them are
+    sent twice with the same key, like a client retrying after a timeout.
+    """
+
+    def __init__(self, host, port, endpoint, forms, think_ms, retry_rate):
+        self.host, self.port = host, port
+        self.endpoint = endpoint
+        self.forms = forms
+        self.think_ms = think_ms
+        self.retry_rate = retry_rate
+        self.questions = {}
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def timed(self, kind, method, path, payload=None, headers=None):
+        started = time.perf_counter()
+        try:
+            status, body = await http_request(self.host, self.port, method, path, payload, headers)
+        except (OSError, IndexError, ValueError):
+            status, body = None, b''
+        self.latencies[kind].append(time.perf_counter() - started)
+        self.statuses[kind][status] += 1
+        return status, body
+
+    async def session(self, rng):
+        form_id = rng.choice(self.forms)
+        status, body = await self.timed('load', 'GET', f'/api/forms/{form_id}/questions/?page_size=1000')
+        if status != 200:
+            return
+        # Every respondent loads the form, the definition is only parsed once
+        if form_id not in self.questions:
+            self.questions[form_id] = [SimpleNamespace(**question) for question in json.loads(body)['results']]
+        if self.think_ms:
+            await asyncio.sleep(rng.expovariate(1000 / self.think_ms))
+
+        answers = []
+        for question in self.questions[form_id]:
+            fields = random_answer(rng, question)
+            if fields is not None:
+                answers.append({'question': question.id, **fields})
+        payload = {'form': form_id, 'answers': answers}
+        headers = {'Idempotency-Key': str(uuid.UUID(int=rng.getrandbits(128)))}
+        await self.timed('submit', 'POST', self.endpoint, payload, headers)
+        if rng.random() < self.retry_rate:
+            await self.timed('retry', 'POST', self.endpoint, payload, headers)
+
+    async def run(self, sessions, concurrency, seed):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(number):
+            async with semaphore:
+                await self.session(random.Random(f'{seed}:{number}'))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(number) for number in range(sessions)))
+        return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay respondent traffic against a running server: load a form, then submit valid answers to it. "
+        "Reports throughput, latency and status codes per kind of request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server under test.")
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='sync', help="Submission endpoint.")
+        parser.add_argument('--form', type=int, action='append', dest='forms',
+                            help="Form to answer, repeatable. Defaults to the first 1000 forms on the server.")
+        parser.add_argument('--sessions', type=int, default=1000, help="Respondents to simulate.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Respondents active at once.")
+        parser.add_argument('--think-ms', type=float, default=0,
+                            help="Mean pause between loading a form and submitting it.")
+        parser.add_argument('--retry-rate', type=float, default=0,
+                            help="Share of submissions sent again with the same Idempotency-Key.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the respondents' choices and answers.")
+
+    def handle(self, *args, url, endpoint, forms, sessions, concurrency, think_ms, retry_rate, seed, **options):
+        host, port = server_address(url)
+
+        if not forms:
+            forms = asyncio.run(self.discover_forms(host, port))
+        if not forms:
+            raise CommandError("The server has no forms, create some with `manage.py seed_forms`.")
+
+        traffic = Traffic(host, port, ENDPOINTS[endpoint], forms, think_ms, retry_rate)
+        elapsed = asyncio.run(traffic.run(sessions, concurrency, seed))
+        self.stdout.write(f"{sessions} sessions over {len(forms)} forms in {elapsed:.1f} s")
+        for kind, latencies in traffic.latencies.items():
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            statuses = ', '.join(f"{status}: {count}" for status, count in sorted(
+                traffic.statuses[kind].items(), key=lambda item: str(item[0])
+            ))
+            self.stdout.write(
+                f"{kind:>6}: {len(latencies) / elapsed:8.1f} req/s, p50 {quantiles[49] * 1000:7.1f} ms, "
+                f"p95 {quantiles[94] * 1000:7.1f} ms, p99 {quantiles[98] * 1000:7.1f} ms ({statuses})"
+            )
+
+    async def discover_forms(self, host, port):
+        try:
+            status, body = await http_request(host, port, 'GET', '/api/forms/?fields=id&page_size=1000')
+        except OSError as exc:
+            raise CommandError(f"Cannot reach the server: {exc}")
+        if status != 200:
+            raise CommandError(f"Listing the forms failed with status {status}.")
+        return [form['id'] for form in json.loads(body)['results']]
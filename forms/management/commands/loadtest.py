@@ -0,0 +1,79 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from forms.loadclient import ENDPOINTS, http_request, server_address
+from forms.models import Form, Question
+
+
+async def run_load(host, port, path, payloads, concurrency, slow_ms):
+    """Send every payload with at most ``concurrency`` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = []
+
+    async def one(payload):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, _ = await http_request(host, port, 'POST', path, payload, slow_ms=slow_ms)
+            except (OSError, IndexError, ValueError):
+                status = None
+            statuses.append(status)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    return time.perf_counter() - started, latencies, statuses
+
+
+class Command(BaseCommand):
+    help = (
+        "Submit a form concurrently to the sync and async bulk answer endpoints of a running server "
+        "and compare their throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server under test.")
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append', dest='endpoints',
+                            help="Endpoint to load, repeatable. Defaults to both.")
+        parser.add_argument('--requests', type=int, default=500, help="Submissions per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Submissions in flight at once.")
+        parser.add_argument('--questions', type=int, default=10, help="Questions per submitted form.")
+        parser.add_argument('--slow-ms', type=int, default=0,
+                            help="Pause between 64 byte chunks of each body to simulate slow clients.")
+        parser.add_argument('--keep', action='store_true', help="Keep the generated form and its submissions.")
+
+    def handle(self, *args, url, endpoints, requests, concurrency, questions, slow_ms, keep, **options):
+        host, port = server_address(url)
+
+        for name in endpoints or sorted(ENDPOINTS):
+            payload, form = self.create_form(questions)
+            try:
+                elapsed, latencies, statuses = asyncio.run(
+                    run_load(host, port, ENDPOINTS[name], [payload] * requests, concurrency, slow_ms)
+                )
+            finally:
+                if not keep:
+                    form.delete()
+
+            failed = sum(status != 201 for status in statuses)
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{name:>5}: {requests / elapsed:8.1f} req/s, p50 {quantiles[49] * 1000:7.1f} ms, "
+                f"p95 {quantiles[94] * 1000:7.1f} ms, {failed} failed"
+            )
+
+    def create_form(self, size):
+        form = Form.objects.create(title="Load test")
+        created = Question.objects.bulk_create(
+            Question(form=form, text=f"Question {j}", question_type='number', min_value=0, max_value=100)
+            for j in range(size)
+        )
+        payload = {
+            'form': form.id,
+            'answers': [{'question': question.id, 'numeric_answer': j} for j, question in enumerate(created)],
+        }
+        return payload, form
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from forms.ingest import drain
+
+
+class Command(BaseCommand):
+    help = "Drain submissions spooled in queue ingestion mode into the answers table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Submissions written per transaction.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit as soon as the queue is empty.")
+
+    def handle(self, *args, batch_size=None, interval=1.0, once=False, **options):
+        total = 0
+        try:
+            while True:
+                processed = drain(batch_size)
+                total += processed
+                if processed:
+                    self.stdout.write(f"Processed {processed} submissions.")
+                elif once:
+                    break
+                else:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} submissions in total."))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from forms.models import Question
+from forms.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-question answer summaries from scratch and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, action='append', dest='forms', help="Only rebuild this form.")
+        parser.add_argument('--check', action='store_true', help="Report drift without writing, fail if any.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Questions rebuilt per transaction.")
+
+    def handle(self, *args, forms=None, check=False, batch_size=500, **options):
+        questions = Question.objects.order_by('id')
+        if forms:
+            questions = questions.filter(form_id__in=forms)
+
+        total = 0
+        drifted = []
+        last_id = 0
+        while True:
+            batch = list(questions.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            total += len(batch)
+            drifted.extend(rebuild_stats(batch, dry_run=check))
+
+        for question_id, fields in drifted:
+            self.stdout.write(f"Question {question_id}: {', '.join(fields)} drifted")
+
+        if check and drifted:
+            raise CommandError(f"{len(drifted)} of {total} question summaries drifted.")
+        verb = "Checked" if check else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} question summaries, {len(drifted)} drifted."))
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from forms.seeding import seed_form
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate forms with questions of every type and valid answers in batched inserts, "
+        "the same data for the same seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=10, help="Forms to create.")
+        parser.add_argument('--questions', type=int, default=2, help="Questions of each type per form.")
+        parser.add_argument('--submissions', type=int, default=100,
+                            help="Responses per form, each answering its questions.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the generated data.")
+        parser.add_argument('--start', type=int, default=0,
+                            help="Index of the first form, to add forms to an earlier run of the same seed.")
+        parser.add_argument('--workers', type=int, default=1, help="Processes inserting forms in parallel.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Answers inserted per transaction.")
+
+    def handle(self, *args, forms, questions, submissions, seed, start, workers, batch_size, **options):
+        if workers > 1 and connection.vendor == 'sqlite':
+            raise CommandError("SQLite allows a single writer, run with --workers 1.")
+        indexes = range(start, start + forms)
+        seed_one = partial(
+            seed_form, seed, questions_per_type=questions, submissions=submissions, batch_size=batch_size
+        )
+
+        started = time.perf_counter()
+        if workers > 1:
+            # Forked workers must open connections of their own
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=django.setup) as pool:
+                results = list(pool.map(seed_one, indexes))
+        else:
+            results = [seed_one(index) for index in indexes]
+        elapsed = time.perf_counter() - started
+
+        created_questions = sum(count for count, _ in results)
+        created_answers = sum(count for _, count in results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {forms} forms, {created_questions} questions and {created_answers} answers "
+            f"in {elapsed:.1f} s ({created_answers / elapsed if elapsed else 0:.0f} answers/s)."
+        ))
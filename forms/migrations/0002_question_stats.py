@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-17 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from forms.stats import record_answer
+
+
+def backfill_stats(apps, schema_editor):
+    # Summarise the answers given so far, so later edits and deletes find their rows
+    Answer = apps.get_model('forms', 'Answer')
+    Question = apps.get_model('forms', 'Question')
+    QuestionStats = apps.get_model('forms', 'QuestionStats')
+    questions = Question.objects.in_bulk(Answer.objects.values_list('question_id', flat=True).distinct())
+    computed = {question_id: QuestionStats(question_id=question_id) for question_id in questions}
+    answers = Answer.objects.values_list('question_id', 'text_answer', 'numeric_answer', 'email_answer')
+    for question_id, *values in answers.iterator(chunk_size=2000):
+        record_answer(computed[question_id], questions[question_id], *values)
+    QuestionStats.objects.bulk_create(computed.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='forms.question')),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('filled_count', models.PositiveIntegerField(default=0)),
+                ('numeric_count', models.PositiveIntegerField(default=0)),
+                ('numeric_sum', models.FloatField(default=0)),
+                ('numeric_min', models.FloatField(blank=True, null=True)),
+                ('numeric_max', models.FloatField(blank=True, null=True)),
+                ('histogram', models.JSONField(blank=True, default=list)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
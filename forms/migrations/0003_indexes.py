@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0002_question_stats'),
+    ]
+
+    # The new indexes go first so the foreign keys are never left unindexed
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['created_at'], name='form_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['form', 'question_type'], name='question_form_type_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='answer',
+            constraint=models.UniqueConstraint(fields=('question',), name='unique_answer_per_question'),
+        ),
+        migrations.AlterField(
+            model_name='answer',
+            name='question',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='forms.question'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='form',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='forms.form'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:35
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('receipt', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('answers', models.JSONField(blank=True, default=list)),
+                ('errors', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='queued_submission_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def group_existing_answers(apps, schema_editor):
+    # Until now a form held a single response, so its answers become one submission
+    Answer = apps.get_model('forms', 'Answer')
+    Form = apps.get_model('forms', 'Form')
+    Submission = apps.get_model('forms', 'Submission')
+    form_ids = Answer.objects.values_list('question__form_id', flat=True).distinct()
+    for form in Form.objects.filter(id__in=form_ids):
+        submission = Submission.objects.create(form=form)
+        Submission.objects.filter(pk=submission.pk).update(created_at=form.created_at)
+        Answer.objects.filter(question__form=form).update(submission=submission)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0004_queued_submission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('form', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='forms.form')),
+                ('respondent', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['form', 'created_at'], name='submission_form_created_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='submission',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='forms.submission'),
+        ),
+        migrations.AddField(
+            model_name='queuedsubmission',
+            name='submission',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='forms.submission'),
+        ),
+        migrations.RunPython(group_existing_answers, migrations.RunPython.noop),
+    ]
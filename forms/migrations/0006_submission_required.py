@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0005_submission'),
+    ]
+
+    # Apart from 0005_submission, which fills answer.submission in: PostgreSQL cannot alter a table
+    # with pending trigger events from that update in the same transaction
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='submission',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='forms.submission'),
+        ),
+        # The question index comes back before the unique constraint that covered it goes away
+        migrations.AlterField(
+            model_name='answer',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='forms.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='answer',
+            constraint=models.UniqueConstraint(fields=('submission', 'question'), name='unique_answer_per_submission'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='answer',
+            name='unique_answer_per_question',
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from forms.search import install_search_index, uninstall_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0006_submission_required'),
+    ]
+
+    # The index lives outside the model state, see forms.search
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-17 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0007_answer_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('document', models.TextField()),
+                ('published_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='forms.form')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='forms.formversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='formversion',
+            constraint=models.UniqueConstraint(fields=('form', 'number'), name='unique_form_version_number'),
+        ),
+    ]
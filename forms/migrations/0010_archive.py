@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0009_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='archived_responses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ResponseArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_submission', models.BigIntegerField()),
+                ('last_submission', models.BigIntegerField()),
+                ('submission_count', models.PositiveIntegerField()),
+                ('answer_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='forms.form')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['form', 'first_submission'], name='archive_form_idx')],
+            },
+        ),
+    ]
@@ -1,10 +1,25 @@
+import uuid
+
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from .validation import get_validator
+
 
 class Form(models.Model):
     title = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # A closed form takes no more answers and may have its responses archived
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_responses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='form_created_at_idx'),
+            # Keyset order of the changes feed
+            models.Index(fields=['updated_at', 'id'], name='form_updated_idx'),
+        ]
 
     def clean(self):
         # Ensure title length is within the limit
@@ -23,7 +38,8 @@ class Question(models.Model):
         ('number', 'Number'),
     )
 
-    form = models.ForeignKey(Form, related_name='questions', on_delete=models.CASCADE)
+    # Covered by question_form_type_idx
+    form = models.ForeignKey(Form, related_name='questions', on_delete=models.CASCADE, db_index=False)
     text = models.CharField(max_length=300)
     required = models.BooleanField(default=True)
     question_type = models.CharField(max_length=20, choices=QUESTION_TYPES)
@@ -31,6 +47,13 @@ class Question(models.Model):
     min_value = models.IntegerField(null=True, blank=True)
     max_value = models.IntegerField(null=True, blank=True)
     allow_decimal = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['form', 'question_type'], name='question_form_type_idx'),
+            models.Index(fields=['updated_at', 'id'], name='question_updated_idx'),
+        ]
 
     def clean(self):
         if self.question_type == 'short_text' and self.max_length > 200:
@@ -47,42 +70,74 @@ class Question(models.Model):
         return self.text
 
 
+class FormVersion(models.Model):
+    """
+    A published form, frozen with its questions into one rendered JSON document.
+
+    Versions are never changed after publishing, so clients may cache them
+    for good and submissions are validated against the version they answer.
+    """
+    # Covered by unique_form_version_number
+    form = models.ForeignKey(Form, related_name='versions', on_delete=models.CASCADE, db_index=False)
+    number = models.PositiveIntegerField()
+    document = models.TextField()
+    published_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['form', 'number'], name='unique_form_version_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.form.title} v{self.number}"
+
+
+class Submission(models.Model):
+    """One response to a form, grouping the answers given together."""
+    form = models.ForeignKey(Form, related_name='submissions', on_delete=models.CASCADE, db_index=False)
+    # The published version the respondent was shown, if any
+    version = models.ForeignKey(
+        FormVersion, related_name='submissions', null=True, blank=True, on_delete=models.SET_NULL
+    )
+    respondent = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Also covers the foreign key
+            models.Index(fields=['form', 'created_at'], name='submission_form_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Submission to: {self.form.title}"
+
+
 class Answer(models.Model):
+    # Covered by unique_answer_per_submission
+    submission = models.ForeignKey(Submission, related_name='answers', on_delete=models.CASCADE, db_index=False)
     question = models.ForeignKey(Question, related_name='answers', on_delete=models.CASCADE)
     text_answer = models.CharField(max_length=5000, blank=True)
     numeric_answer = models.FloatField(null=True, blank=True)
     email_answer = models.EmailField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    def clean(self):
-        provided_answers = [
-            bool(self.text_answer),
-            bool(self.numeric_answer),
-            bool(self.email_answer)
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='answer_updated_idx'),
+        ]
+        constraints = [
+            # Each question is answered at most once per submission
+            models.UniqueConstraint(fields=['submission', 'question'], name='unique_answer_per_submission'),
         ]
 
-        if sum(provided_answers) > 1:
-            raise ValidationError("Only one type of answer can be provided for a single question.")
-
-        if self.question.question_type == 'short_text' or self.question.question_type == 'long_text':
-            if self.text_answer and len(self.text_answer) > self.question.max_length:
-                raise ValidationError(
-                    {'text_answer': f'Answer cannot exceed {self.question.max_length} characters.'}
-                )
-
-        elif self.question.question_type == 'number':
-            if self.numeric_answer is not None:
-                if self.question.min_value is not None and self.numeric_answer < self.question.min_value:
-                    raise ValidationError(
-                        {'numeric_answer': f'Answer must be greater than or equal to {self.question.min_value}.'}
-                    )
-                if self.question.max_value is not None and self.numeric_answer > self.question.max_value:
-                    raise ValidationError(
-                        {'numeric_answer': f'Answer must be less than or equal to {self.question.max_value}.'}
-                    )
-
-        elif self.question.question_type == 'email':
-            if not self.email_answer:
-                raise ValidationError({'email_answer': 'Email answer is required for email type questions.'})
+    def clean(self):
+        # forms.versions imports this module
+        from .versions import answered_question
+
+        question = answered_question(self.question, self.submission if self.submission_id else None)
+        if question is None:
+            raise ValidationError('This question is not part of the version this submission answers.')
+        get_validator(question).validate(self.text_answer, self.numeric_answer, self.email_answer)
 
     def save(self, *args, **kwargs):
         self.clean()
@@ -90,3 +145,91 @@ class Answer(models.Model):
 
     def __str__(self):
         return f"Answer to: {self.question.text}"
+
+
+class ResponseArchive(models.Model):
+    """
+    A batch of a closed form's responses, moved out of the hot tables.
+
+    ``data`` is gzipped JSON Lines, one submission with its answers per
+    line, see ``forms.archive``.
+    """
+    # Covered by archive_form_idx
+    form = models.ForeignKey(Form, related_name='archives', on_delete=models.CASCADE, db_index=False)
+    first_submission = models.BigIntegerField()
+    last_submission = models.BigIntegerField()
+    submission_count = models.PositiveIntegerField()
+    answer_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['form', 'first_submission'], name='archive_form_idx'),
+        ]
+
+    def __str__(self):
+        return f"Responses {self.first_submission}-{self.last_submission} to: {self.form.title}"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted form, question or answer, kept for the changes feed.
+
+    Only the row a delete started from is recorded: the questions and
+    answers deleted along with a form, or the answers of a question, go
+    with their tombstone.
+    """
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
+
+
+class QuestionStats(models.Model):
+    """Running aggregates of a question's answers, kept up to date on every write."""
+    question = models.OneToOneField(Question, related_name='stats', on_delete=models.CASCADE, primary_key=True)
+    answer_count = models.PositiveIntegerField(default=0)
+    filled_count = models.PositiveIntegerField(default=0)
+    numeric_count = models.PositiveIntegerField(default=0)
+    numeric_sum = models.FloatField(default=0)
+    numeric_min = models.FloatField(null=True, blank=True)
+    numeric_max = models.FloatField(null=True, blank=True)
+    histogram = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"Stats for: {self.question.text}"
+
+
+class QueuedSubmission(models.Model):
+    """A validated submission spooled for the ingestion worker, doubling as the client's receipt."""
+    STATUSES = (
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    receipt = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='pending')
+    submission = models.ForeignKey(Submission, null=True, blank=True, on_delete=models.SET_NULL)
+    answers = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker only ever scans the pending rows, oldest first
+            models.Index(fields=['id'], condition=models.Q(status='pending'), name='queued_submission_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Submission {self.receipt} ({self.status})"
@@ -0,0 +1,114 @@
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .changes import encode_cursor
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key.
+
+    Each page is a single ``WHERE id > cursor ORDER BY id LIMIT n`` query, so
+    deep pages cost the same as the first one and no ``COUNT(*)`` is issued.
+    The page size defaults to ``REST_FRAMEWORK['PAGE_SIZE']`` and can be
+    overridden per request with ``?page_size=`` up to ``max_page_size``.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CreatedAtCursorPagination(IdCursorPagination):
+    """Keyset pagination in submission order, served by the ``(form, created_at)`` index."""
+    ordering = 'created_at'
+
+
+class RankedPagination(BasePagination):
+    """
+    Offset pages over results ordered by relevance rather than by a column.
+
+    ``paginate`` asks the search for one row more than the page to find out
+    whether a next page exists, so no ``COUNT(*)`` is issued. Responses
+    have the same shape as the cursor pages.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    offset_query_param = 'offset'
+
+    def paginate(self, search, request):
+        """Call ``search(limit, offset)`` for the requested page and return its rows."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.offset = self.get_offset(request)
+        rows = search(self.page_size + 1, self.offset)
+        self.has_next = len(rows) > self.page_size
+        return rows[:self.page_size]
+
+    def get_page_size(self, request):
+        return self._positive_int(
+            request.query_params.get(self.page_size_query_param), api_settings.PAGE_SIZE or 50, self.max_page_size
+        )
+
+    def get_offset(self, request):
+        return self._positive_int(request.query_params.get(self.offset_query_param), 0, None)
+
+    @staticmethod
+    def _positive_int(value, default, cutoff):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        if value < 0:
+            return default
+        return min(value, cutoff) if cutoff else value
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.offset_query_param, self.offset + self.page_size)
+
+    def get_previous_link(self):
+        if self.offset <= 0:
+            return None
+        url = self.request.build_absolute_uri()
+        offset = max(self.offset - self.page_size, 0)
+        if offset == 0:
+            return remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.offset_query_param, offset)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
+
+
+class ChangesPagination(RankedPagination):
+    """
+    Pages of the changes feed, each resuming from the ``since`` cursor.
+
+    Responses also carry the ``cursor`` to poll from once the feed has been
+    read to the end; it stays put while nothing changes.
+    """
+    cursor_query_param = 'since'
+
+    def paginate(self, feed, request):
+        """Call ``feed(limit)`` for the requested page and return its changes."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        changes = feed(self.page_size + 1)
+        self.has_next = len(changes) > self.page_size
+        changes = changes[:self.page_size]
+        if changes:
+            self.cursor = encode_cursor(changes[-1]['position'])
+        else:
+            self.cursor = request.query_params.get(self.cursor_query_param)
+        return changes
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'cursor': self.cursor, 'results': data})
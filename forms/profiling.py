@@ -0,0 +1,141 @@
+"""
+Per-request timing and SQL instrumentation, enabled with ``FORMS_PROFILING``.
+
+Every database connection gets an execute wrapper that times its queries
+into the profile of the request being served, if any. The profile lives in
+a context variable, so queries that async views run through
+``sync_to_async`` are attributed to their request as well.
+"""
+import cProfile
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_queries = ContextVar('forms_profiling_queries', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    queries = _queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append((sql, time.perf_counter() - start))
+
+
+def instrument_connection(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def record_queries():
+    """Collect ``(sql, seconds)`` for every query run in this context."""
+    queries = []
+    token = _queries.set(queries)
+    try:
+        yield queries
+    finally:
+        _queries.reset(token)
+
+
+def duplicate_queries(queries):
+    """Statements run more than once with any parameters, most repeated first."""
+    counts = Counter(sql for sql, _ in queries)
+    return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+
+class ProfilingMiddleware:
+    """
+    Reports wall time, database time and query count of every request.
+
+    The numbers go into a ``Server-Timing`` header and one JSON log line on
+    the ``forms.profiling`` logger, together with statements that ran more
+    than once, the usual sign of a serializer querying per row. A
+    ``FORMS_PROFILING_SAMPLE_RATE`` share of sync requests is also run under
+    cProfile and dumped to ``FORMS_PROFILING_DIR``, one file per request
+    named after its view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.FORMS_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.FORMS_PROFILING_SAMPLE_RATE
+        self.profile_dir = Path(settings.FORMS_PROFILING_DIR)
+        # Connections opened later are instrumented by the connection_created signal
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        profile = cProfile.Profile() if self.sample_rate and random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        with record_queries() as queries:
+            if profile is None:
+                response = self.get_response(request)
+            else:
+                response = profile.runcall(self.get_response, request)
+        self.report(request, response, time.perf_counter() - started, queries, profile)
+        return response
+
+    async def __acall__(self, request):
+        # cProfile only sees its own thread, which would mix in every request sharing the event loop
+        started = time.perf_counter()
+        with record_queries() as queries:
+            response = await self.get_response(request)
+        self.report(request, response, time.perf_counter() - started, queries, None)
+        return response
+
+    def report(self, request, response, elapsed, queries, profile):
+        match = request.resolver_match
+        view = match.view_name if match else None
+        db_time = sum(seconds for _, seconds in queries)
+        duplicates = duplicate_queries(queries)
+
+        response['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={db_time * 1000:.1f};desc="{len(queries)} queries"'
+        )
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'db_ms': round(db_time * 1000, 1),
+            'queries': len(queries),
+            'duplicate_queries': sum(count - 1 for _, count in duplicates),
+        }
+        if duplicates:
+            record['most_repeated'] = {'sql': duplicates[0][0][:500], 'count': duplicates[0][1]}
+        if profile is not None:
+            record['profile'] = str(self.dump(profile, view))
+        logger.info(json.dumps(record))
+
+    def dump(self, profile, view):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r'[^\w.-]', '_', view or 'unresolved')
+        path = self.profile_dir / f'{name}.{time.time_ns()}.prof'
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,61 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stock renderer takes over
+    orjson = None
+
+
+class PassthroughRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept a format whose body the view streams itself.
+
+    Views using these renderers return a ``StreamingHttpResponse``, so
+    ``render`` only produces bodies for error responses such as a 404.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JSONLinesRenderer(PassthroughRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'jsonl'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` on top of orjson, writing the same bytes for API payloads.
+
+    Types orjson does not handle the way DRF does, such as datetimes and
+    decimals, go through DRF's encoder. Floats that ``repr`` writes with
+    an exponent come out in orjson's notation instead, such as ``1e16`` for
+    ``1e+16``, ``1e-7`` for ``1e-07`` and ``0.00001`` for ``1e-05``. They
+    parse to the same numbers, and finding them in the output would cost
+    more than orjson saves. Indented output, ASCII escaping and payloads orjson rejects, like
+    integers beyond 64 bits, are left to the stock renderer, as is
+    everything when orjson is not installed.
+    """
+    options = 0 if orjson is None else orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like the stock renderer, keep the output a strict JavaScript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,126 @@
+"""
+Read-replica routing.
+
+``ReplicaMiddleware`` decides per request whether its reads may be served
+by a replica: only safe methods on views marked ``replica_reads``, and only
+for clients that have not written recently. A write sets a cookie that pins
+the client to the primary for ``DATABASE_REPLICA_PIN_SECONDS``, long enough
+for the replicas to catch up so the client reads its own writes.
+``ReplicaRouter`` then sends those reads to a random alias of
+``DATABASE_REPLICAS``. Everything else, including management commands,
+uses ``default``. Responses cached or validated by a change stamp are
+built within ``primary_reads_after`` the stamp, since a replica read just
+after a change would be stored and revalidated as the new data.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'forms_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _Routing:
+    __slots__ = ('replica',)
+
+    def __init__(self):
+        self.replica = False
+
+
+_routing = ContextVar('forms_routing', default=None)
+
+
+def replica_reads(view):
+    """Mark a function view whose safe requests may read from a replica."""
+    view.replica_reads = True
+    return view
+
+
+@contextmanager
+def primary_reads_after(changed_at):
+    """
+    Send the request's reads to the primary while ``changed_at`` is recent.
+
+    ``changed_at`` is a change stamp in nanoseconds. The replicas are given
+    ``DATABASE_REPLICA_PIN_SECONDS`` to catch up with it, like clients that wrote.
+    """
+    routing = _routing.get()
+    recent = time.time_ns() - changed_at < settings.DATABASE_REPLICA_PIN_SECONDS * 1_000_000_000
+    if routing is None or not routing.replica or not recent:
+        yield
+        return
+    routing.replica = False
+    try:
+        yield
+    finally:
+        routing.replica = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # DatabaseCache entries hold the version stamps, a lagging copy would serve stale data
+        if model._meta.app_label == 'django_cache':
+            return 'default'
+        routing = _routing.get()
+        if routing is not None and routing.replica and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _routing.set(_Routing())
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = _routing.set(_Routing())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF viewsets expose their class on the view function
+        view = getattr(view_func, 'cls', view_func)
+        routing = _routing.get()
+        if (
+            routing is not None
+            and request.method in SAFE_METHODS
+            and getattr(view, 'replica_reads', False)
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            routing.replica = True
+
+    def pin(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,127 @@
+"""
+Full-text search over ``Answer.text_answer``.
+
+The index lives in the database, outside the Django model: an external
+content FTS5 table kept in sync by triggers on SQLite, and a generated
+``tsvector`` column with a GIN index on PostgreSQL. Every write path,
+including ``bulk_create`` and queryset updates, keeps it current. Other
+backends fall back to an ``icontains`` scan.
+"""
+from django.db import connections
+
+from .models import Answer
+
+SQLITE_TRIGGERS = {
+    'forms_answer_fts_insert': (
+        "CREATE TRIGGER IF NOT EXISTS forms_answer_fts_insert AFTER INSERT ON forms_answer BEGIN "
+        "INSERT INTO forms_answer_fts(rowid, text_answer) VALUES (new.id, new.text_answer); END"
+    ),
+    'forms_answer_fts_delete': (
+        "CREATE TRIGGER IF NOT EXISTS forms_answer_fts_delete AFTER DELETE ON forms_answer BEGIN "
+        "INSERT INTO forms_answer_fts(forms_answer_fts, rowid, text_answer) "
+        "VALUES ('delete', old.id, old.text_answer); END"
+    ),
+    'forms_answer_fts_update': (
+        "CREATE TRIGGER IF NOT EXISTS forms_answer_fts_update AFTER UPDATE OF text_answer ON forms_answer BEGIN "
+        "INSERT INTO forms_answer_fts(forms_answer_fts, rowid, text_answer) "
+        "VALUES ('delete', old.id, old.text_answer); "
+        "INSERT INTO forms_answer_fts(rowid, text_answer) VALUES (new.id, new.text_answer); END"
+    ),
+}
+
+POSTGRES_INDEX = [
+    # 'simple' does not stem, so answers in any language are matched word for word
+    "ALTER TABLE forms_answer ADD COLUMN IF NOT EXISTS text_search tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', text_answer)) STORED",
+    "CREATE INDEX IF NOT EXISTS forms_answer_text_search_idx ON forms_answer USING GIN (text_search)",
+]
+
+
+def install_search_index(connection):
+    """Create the full-text index of ``connection`` and fill it from the existing answers."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS forms_answer_fts USING fts5(text_answer, "
+                "content='forms_answer', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            for statement in SQLITE_TRIGGERS.values():
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO forms_answer_fts(forms_answer_fts) VALUES ('rebuild')")
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRES_INDEX:
+                cursor.execute(statement)
+
+
+def repair_search_index(connection):
+    """
+    Put back the SQLite triggers and reindex if they went missing.
+
+    SQLite drops them whenever a migration rebuilds ``forms_answer``, so
+    this runs after every ``migrate``.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE name = 'forms_answer_fts' OR (type = 'trigger' AND tbl_name = 'forms_answer')"
+        )
+        existing = {name for name, in cursor.fetchall()}
+    if 'forms_answer_fts' in existing and not existing.issuperset(SQLITE_TRIGGERS):
+        install_search_index(connection)
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute("DROP TABLE IF EXISTS forms_answer_fts")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS forms_answer_text_search_idx")
+            cursor.execute("ALTER TABLE forms_answer DROP COLUMN IF EXISTS text_search")
+
+
+def _fts5_query(text):
+    # Quote every term so user input is never parsed as FTS5 syntax; the terms are ANDed
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in text.split())
+
+
+def search_answers(form, text, limit, offset=0):
+    """
+    Answers to ``form`` whose text matches every word of ``text``, best match first.
+
+    Each answer carries its relevance as ``rank``, higher is better. One
+    query per call, served by the full-text index.
+    """
+    connection = connections[Answer.objects.db]
+    columns = ', '.join(f'a.{field.column}' for field in Answer._meta.concrete_fields)
+    if connection.vendor == 'sqlite':
+        query = _fts5_query(text)
+        if not query:
+            return []
+        sql = (
+            f"SELECT {columns}, -bm25(forms_answer_fts) AS rank FROM forms_answer_fts "
+            "JOIN forms_answer a ON a.id = forms_answer_fts.rowid "
+            "JOIN forms_question q ON q.id = a.question_id "
+            "WHERE forms_answer_fts MATCH %s AND q.form_id = %s "
+            "ORDER BY bm25(forms_answer_fts), a.id LIMIT %s OFFSET %s"
+        )
+        params = [query, form.id, limit, offset]
+    elif connection.vendor == 'postgresql':
+        sql = (
+            f"SELECT {columns}, ts_rank(a.text_search, query) AS rank "
+            "FROM forms_answer a JOIN forms_question q ON q.id = a.question_id, "
+            "plainto_tsquery('simple', %s) query "
+            "WHERE a.text_search @@ query AND q.form_id = %s "
+            "ORDER BY rank DESC, a.id LIMIT %s OFFSET %s"
+        )
+        params = [text, form.id, limit, offset]
+    else:
+        answers = Answer.objects.filter(question__form=form, text_answer__icontains=text).order_by('id')
+        answers = list(answers[offset:offset + limit])
+        for answer in answers:
+            answer.rank = None
+        return answers
+    return list(Answer.objects.raw(sql, params))
@@ -0,0 +1,106 @@
+"""
+Deterministic generation of forms, questions and valid answers.
+
+Each form is generated from its own random generator, seeded with the
+run's seed and the form's index, so a seed always yields the same data
+whatever the number of worker processes. ``random_answer`` is shared with
+``manage.py loadgen``, which submits the same kinds of values.
+"""
+import random
+
+from django.db import transaction
+
+from .models import Answer, Form, Question, Submission
+from .stats import apply_answers
+
+WORDS = (
+    'able', 'bright', 'calm', 'daily', 'early', 'fair', 'good', 'happy', 'ideal', 'just', 'kind', 'late', 'mild',
+    'new', 'open', 'plain', 'quick', 'rare', 'safe', 'true', 'usual', 'vast', 'warm', 'young', 'zealous',
+)
+# Share of optional questions a respondent leaves out
+SKIP_RATE = 0.2
+
+
+def form_random(seed, index):
+    return random.Random(f'{seed}:{index}')
+
+
+def _words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def random_question(rng, question_type):
+    """The field values of a question of ``question_type`` with plausible bounds."""
+    fields = {'question_type': question_type, 'required': rng.random() < 0.7}
+    if question_type == 'short_text':
+        fields['max_length'] = rng.choice((50, 100, 200))
+    elif question_type == 'long_text':
+        fields['max_length'] = rng.choice((500, 1000, 5000))
+    elif question_type == 'number':
+        fields['min_value'] = rng.choice((0, 1, -10))
+        fields['max_value'] = fields['min_value'] + rng.choice((5, 10, 100, 1000))
+        fields['allow_decimal'] = rng.random() < 0.3
+    return fields
+
+
+def random_answer(rng, question):
+    """
+    The answer fields of a valid answer to ``question``, or ``None`` to leave it out.
+
+    ``question`` only needs the attributes of a ``Question``, so definitions
+    read from the API work as well.
+    """
+    if not question.required and rng.random() < SKIP_RATE:
+        return None
+    if question.question_type in ('short_text', 'long_text'):
+        count = rng.randint(1, 8) if question.question_type == 'short_text' else rng.randint(10, 80)
+        text = _words(rng, count)
+        return {'text_answer': text[:question.max_length] if question.max_length else text}
+    if question.question_type == 'number':
+        low = question.min_value if question.min_value is not None else 0
+        high = question.max_value if question.max_value is not None else low + 100
+        value = round(rng.uniform(low, high), 2) if question.allow_decimal else rng.randint(low, high)
+        return {'numeric_answer': value}
+    if question.question_type == 'email':
+        return {'email_answer': f'{rng.choice(WORDS)}.{rng.randrange(100_000)}@example.com'}
+    return {'text_answer': _words(rng, 3)}
+
+
+def seed_form(seed, index, questions_per_type, submissions, batch_size=5000):
+    """
+    Create form ``index`` of run ``seed`` with its questions and ``submissions`` responses.
+
+    Rows are inserted with ``bulk_create``, one transaction per batch of
+    about ``batch_size`` answers, and the answer summaries are updated per
+    batch like ``save_submission`` does. Returns the number of questions and
+    answers created.
+    """
+    rng = form_random(seed, index)
+    form = Form.objects.create(title=f"Seeded form {seed}-{index}"[:100])
+    questions = Question.objects.bulk_create(
+        Question(form=form, text=f"{_words(rng, 4).capitalize()}?", **random_question(rng, question_type))
+        for question_type, _ in Question.QUESTION_TYPES
+        for _ in range(questions_per_type)
+    )
+    if not questions:
+        return 0, 0
+
+    answered = 0
+    per_batch = max(batch_size // len(questions), 1)
+    for start in range(0, submissions, per_batch):
+        with transaction.atomic():
+            created = Submission.objects.bulk_create(
+                Submission(form=form, respondent=f'seed-{index}-{start + n}')
+                for n in range(min(per_batch, submissions - start))
+            )
+            answers = []
+            for submission in created:
+                for question in questions:
+                    fields = random_answer(rng, question)
+                    if fields is not None:
+                        answers.append(Answer(submission=submission, question=question, **fields))
+            answers = Answer.objects.bulk_create(answers)
+            # bulk_create skips post_save, so fold the batch into the summaries here
+            apply_answers(answers)
+        answered += len(answers)
+    return len(questions), answered
@@ -1,16 +1,48 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Form, Question, Answer
+from rest_framework.fields import get_error_detail
+from rest_framework.settings import api_settings
+from .conditional import bump_stamp
+from .models import Form, FormVersion, Question, Answer, QueuedSubmission, Submission
+from .sparse import SparseFieldsMixin
+from .stats import apply_answers
+from .validation import get_validator
+from .versions import answered_question, version_questions
 from rest_framework.exceptions import ValidationError
 
 
-class FormSerializer(serializers.ModelSerializer):
+CLOSED_FORM_ERROR = 'This form is closed and no longer accepts answers.'
+VERSION_QUESTION_ERROR = 'This question is not part of the version this submission answers.'
+
+
+class FormSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable = {
+        'questions': lambda: QuestionDefinitionSerializer(many=True, read_only=True),
+    }
+
     class Meta:
         model = Form
-        fields = ['id', 'title', 'created_at']
+        fields = ['id', 'title', 'created_at', 'closed_at']
+        # Set by the close action
+        read_only_fields = ['closed_at']
+
+
+def check_max_length(question_type, value):
+    if value is not None:
+        if value < 0:
+            raise ValidationError('Max length cannot be negative.')
+        if question_type == 'short_text' and value > 200:
+            raise ValidationError('Max length for short text question cannot exceed 200 characters.')
+        if question_type == 'long_text' and value > 5000:
+            raise ValidationError('Max length for long text question cannot exceed 5000 characters.')
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     form = FormSerializer()
+    expandable = {
+        'form': lambda: FormSerializer(read_only=True),
+    }
 
     class Meta:
         model = Question
@@ -18,15 +50,8 @@ class QuestionSerializer(serializers.ModelSerializer):
                   'allow_decimal']
 
     def validate_max_length(self, value):  # field-level validation for max_length
-        if value is not None:
-            if value < 0:
-                raise ValidationError('Max length cannot be negative.')
-
-            question_type = self.initial_data.get('question_type')  # Get question type from input
-            if question_type == 'short_text' and value > 200:
-                raise ValidationError('Max length for short text question cannot exceed 200 characters.')
-            if question_type == 'long_text' and value > 5000:
-                raise ValidationError('Max length for long text question cannot exceed 5000 characters.')
+        question_type = self.initial_data.get('question_type')  # Get question type from input
+        check_max_length(question_type, value)
         return value
 
     def validate(self, attrs):  # object-level validation
@@ -57,60 +82,257 @@ class QuestionSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class AnswerSerializer(serializers.ModelSerializer):
+
+class QuestionDefinitionSerializer(QuestionSerializer):
+    """One question of a form definition, checked with the rules of ``QuestionSerializer``."""
+    form = None
+    expandable = {}
+
+    class Meta(QuestionSerializer.Meta):
+        fields = ['id', 'text', 'required', 'question_type', 'max_length', 'min_value', 'max_value',
+                  'allow_decimal']
+
+    def validate_max_length(self, value):
+        # A list item has no initial_data of its own to read the type from, see validate
+        return value
+
+    def validate(self, attrs):
+        try:
+            check_max_length(attrs.get('question_type'), attrs.get('max_length'))
+        except ValidationError as exc:
+            raise ValidationError({'max_length': exc.detail})
+        return super().validate(attrs)
+
+
+class FormDefinitionSerializer(serializers.ModelSerializer):
+    """
+    A whole form with its questions in order, created in one transaction.
+
+    Every question is validated before anything is written, and they are
+    inserted with a single ``bulk_create``.
+    """
+    questions = QuestionDefinitionSerializer(many=True, max_length=1000)
+
+    class Meta:
+        model = Form
+        fields = ['id', 'title', 'created_at', 'questions']
+
+    def create(self, validated_data):
+        questions = validated_data.pop('questions')
+        with transaction.atomic():
+            form = Form.objects.create(**validated_data)
+            created = Question.objects.bulk_create(Question(form=form, **question) for question in questions)
+        # bulk_create skips post_save, but the new form has nothing cached yet
+        form._prefetched_objects_cache = {'questions': created}
+        return form
+
+
+def check_answer(question, attrs):
+    """Validate the answer in ``attrs`` with the compiled rules of ``question``."""
+    try:
+        get_validator(question).validate(
+            attrs.get('text_answer', ''), attrs.get('numeric_answer'), attrs.get('email_answer')
+        )
+    except DjangoValidationError as exc:
+        raise ValidationError(get_error_detail(exc))
+
+
+class AnswerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable = {
+        'question': lambda: QuestionDefinitionSerializer(read_only=True),
+    }
+
     class Meta:
         model = Answer
-        fields = ['id', 'question', 'text_answer', 'numeric_answer', 'email_answer']
+        fields = ['id', 'submission', 'question', 'text_answer', 'numeric_answer', 'email_answer']
+        extra_kwargs = {
+            'submission': {'required': False},
+            # The form is checked for being closed
+            'question': {'queryset': Question.objects.select_related('form')},
+        }
+        # unique_answer_per_submission is enforced by the database, see create
+        validators = []
 
     def validate(self, attrs):
         question = attrs.get('question')
+        submission = attrs.get('submission')
+        if submission is not None and submission.form_id != question.form_id:
+            raise ValidationError({'submission': 'This submission belongs to another form.'})
+        if question.form.closed_at is not None:
+            raise ValidationError({'question': CLOSED_FORM_ERROR})
+        # An update keeps the submission it was made in
+        rules = answered_question(question, submission or getattr(self.instance, 'submission', None))
+        if rules is None:
+            raise ValidationError({'question': VERSION_QUESTION_ERROR})
+        check_answer(rules, attrs)
+        return attrs
+
+    def create(self, validated_data):
+        # The unique constraint rejects a second answer, even from a concurrent request
+        try:
+            with transaction.atomic():
+                if validated_data.get('submission') is None:
+                    # A lone answer starts a submission of its own
+                    validated_data['submission'] = Submission.objects.create(
+                        form_id=validated_data['question'].form_id
+                    )
+                return super().create(validated_data)
+        except IntegrityError:
+            raise duplicate_answer_error()
+
+    def update(self, instance, validated_data):
+        # Moving an answer onto a question its submission answered hits the same constraint
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise duplicate_answer_error()
+
+
+def duplicate_answer_error():
+    # Same shape as the validator the unique constraint replaced
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: ["An answer already exists for this question."]})
 
-        # Check if multiple answer types are provided
-        provided_answers = [
-            bool(attrs.get('text_answer')),
-            bool(attrs.get('numeric_answer')),
-            bool(attrs.get('email_answer'))
-        ]
-
-        if sum(provided_answers) > 1:
-            raise ValidationError("Only one type of answer can be provided for a single question.")
-
-        # Check for existing answer
-        if Answer.objects.filter(question=question).exists():
-            raise ValidationError("An answer already exists for this question.")
-
-        # Validation for short_text and long_text questions
-        if question.question_type in ['short_text', 'long_text']:
-            text_answer = attrs.get('text_answer', '')
-            if not text_answer:
-                raise ValidationError({'text_answer': 'This field is required for text type questions.'})
-            if len(text_answer) > question.max_length:
-                raise ValidationError(
-                    {'text_answer': f'Answer length cannot exceed {question.max_length} characters.'}
-                )
-
-        # Validation for number questions
-        elif question.question_type == 'number':
-            numeric_answer = attrs.get('numeric_answer')
-            if numeric_answer is None:
-                raise ValidationError({'numeric_answer': 'This field is required for numeric type questions.'})
-            if question.min_value is not None and numeric_answer < question.min_value:
-                raise ValidationError(
-                    {'numeric_answer': f'Answer must be greater than or equal to {question.min_value}.'}
-                )
-            if question.max_value is not None and numeric_answer > question.max_value:
-                raise ValidationError(
-                    {'numeric_answer': f'Answer must be less than or equal to {question.max_value}.'}
-                )
-
-        # Validation for email questions
-        elif question.question_type == 'email':
-            email_answer = attrs.get('email_answer')
-            if not email_answer:
-                raise ValidationError({'email_answer': 'This field is required for email type questions.'})
 
+class BulkAnswerItemSerializer(serializers.ModelSerializer):
+    # Plain id so the batch can resolve every question with a single query
+    question = serializers.IntegerField(source='question_id')
+
+    class Meta:
+        model = Answer
+        fields = ['question', 'text_answer', 'numeric_answer', 'email_answer']
+
+
+def validate_submission(questions, answers, published=None):
+    """
+    Validate the ``answers`` of one submission against the form's ``questions``.
+
+    ``questions`` maps ids to the form's questions, so nothing is queried
+    here. Each item's ``question_id`` is replaced with its ``question``.
+    When the respondent was shown a published version, ``published`` maps
+    ids to its questions, and their rules apply instead of the live ones.
+    """
+    rules = questions if published is None else published
+    errors = []
+    seen = set()
+    for item in answers:
+        question_id = item.pop('question_id')
+        question = questions.get(question_id)
+        try:
+            if question_id not in rules:
+                raise ValidationError({'question': f'Question {question_id} does not belong to this form.'})
+            if question is None:
+                raise ValidationError({'question': f'Question {question_id} has been removed from this form.'})
+            if question_id in seen:
+                raise ValidationError({'question': 'This question is answered more than once.'})
+            seen.add(question_id)
+            check_answer(rules[question_id], item)
+        except ValidationError as exc:
+            errors.append(exc.detail)
+        else:
+            errors.append({})
+        item['question'] = question
+
+    if any(errors):
+        raise ValidationError({'answers': errors})
+
+    missing = [
+        question.id for question in rules.values()
+        if question.required and question.id not in seen
+    ]
+    if missing:
+        raise ValidationError({'answers': f'Missing answers for required questions: {missing}.'})
+
+
+def save_submission(form_id, items, respondent='', submission_id=None, version_id=None):
+    """
+    Insert validated answers and their summaries in one transaction.
+
+    The answers start a new submission, answering version ``version_id`` if
+    given, unless ``submission_id`` names an existing one, in which case a
+    repeated question raises ``IntegrityError``.
+    """
+    with transaction.atomic():
+        if submission_id is None:
+            submission_id = Submission.objects.create(
+                form_id=form_id, respondent=respondent, version_id=version_id
+            ).id
+        answers = Answer.objects.bulk_create(Answer(submission_id=submission_id, **item) for item in items)
+        # bulk_create skips post_save, so fold the batch into the summaries and
+        # invalidate the responses showing the submission here
+        apply_answers(answers)
+        bump_stamp('answer')
+    return answers
+
+
+class BulkAnswerSerializer(serializers.Serializer):
+    """Validates and stores every answer of a form submission in one go."""
+    form = serializers.PrimaryKeyRelatedField(queryset=Form.objects.all())
+    version = serializers.PrimaryKeyRelatedField(queryset=FormVersion.objects.all(), required=False)
+    respondent = serializers.CharField(max_length=64, required=False, allow_blank=True)
+    answers = BulkAnswerItemSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs):
+        version = attrs.get('version')
+        if attrs['form'].closed_at is not None:
+            raise ValidationError({'form': CLOSED_FORM_ERROR})
+        if version is not None and version.form_id != attrs['form'].id:
+            raise ValidationError({'version': 'This version belongs to another form.'})
+        questions = {question.id: question for question in attrs['form'].questions.all()}
+        validate_submission(questions, attrs['answers'], version and version_questions(version))
         return attrs
 
+    def create(self, validated_data):
+        version = validated_data.get('version')
+        return save_submission(
+            validated_data['form'].id, validated_data['answers'], validated_data.get('respondent', ''),
+            version_id=version and version.id
+        )
+
+
+class SubmissionAnswerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Answer
+        fields = ['id', 'question', 'text_answer', 'numeric_answer', 'email_answer']
+
+
+class SubmissionSerializer(serializers.ModelSerializer):
+    answers = SubmissionAnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Submission
+        fields = ['id', 'form', 'version', 'respondent', 'created_at', 'answers']
+
+
+class AnswerSearchResultSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Answer
+        fields = ['id', 'submission', 'question', 'text_answer', 'rank']
+
+
+class FormVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FormVersion
+        fields = ['id', 'form', 'number', 'published_at']
+
+
+class ReceiptSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QueuedSubmission
+        fields = ['receipt', 'status', 'submission', 'answers', 'errors', 'created_at', 'processed_at']
+
+
+class ChangeSerializer(serializers.Serializer):
+    """One entry of the changes feed: the changed row's columns, or ``null`` once it is deleted."""
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
+    deleted = serializers.BooleanField()
+    data = serializers.DictField(allow_null=True)
+
+
 # class AnswerSerializer(serializers.ModelSerializer):
 #     class Meta:
 #         model = Answer
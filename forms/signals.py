@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_form_version
+from .conditional import bump_stamp
+from .models import Form, Question, Answer, Tombstone
+from .profiling import instrument_connection
+from .search import repair_search_index
+from .stats import apply_answers, rebuild_stats
+
+# Question fields that decide how its answers are summarized
+STATS_BOUNDS = ('question_type', 'min_value', 'max_value')
+# Deleting one of these deletes the rows along with it
+PARENTS = {Form: (), Question: (Form,), Answer: (Question, Form)}
+
+
+def _origin_model(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin) if origin is not None else None
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+def invalidate_form(sender, instance, **kwargs):
+    bump_form_version(instance.pk)
+
+
+@receiver(post_save, sender=Form)
+@receiver(post_delete, sender=Form)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_responses(sender, **kwargs):
+    bump_stamp(sender._meta.model_name)
+
+
+@receiver(pre_save, sender=Question)
+def invalidate_previous_form(sender, instance, **kwargs):
+    instance._stats_stale = False
+    if instance.pk is None:
+        return
+    previous = Question.objects.filter(pk=instance.pk).values('form_id', *STATS_BOUNDS).first()
+    if previous is None:
+        return
+    # QuestionSerializer.update may move a question to another form
+    if previous['form_id'] != instance.form_id:
+        bump_form_version(previous['form_id'])
+    instance._stats_stale = any(previous[field] != getattr(instance, field) for field in STATS_BOUNDS)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_form(sender, instance, **kwargs):
+    bump_form_version(instance.form_id)
+
+
+@receiver(post_save, sender=Question)
+def rebuild_question_stats(sender, instance, **kwargs):
+    # New bounds move every answer to another histogram bin
+    if getattr(instance, '_stats_stale', False):
+        rebuild_stats([instance])
+
+
+@receiver(pre_save, sender=Answer)
+def remember_previous_answer(sender, instance, **kwargs):
+    instance._stats_previous = None
+    if instance.pk is not None:
+        instance._stats_previous = Answer.objects.filter(pk=instance.pk).select_related('question').first()
+
+
+@receiver(post_save, sender=Answer)
+def count_answer(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is not None:
+        apply_answers([previous], sign=-1)
+    apply_answers([instance])
+
+
+@receiver(post_delete, sender=Answer)
+def uncount_answer(sender, instance, origin=None, **kwargs):
+    # Deleting a question or form cascades to its summary as well
+    if _origin_model(origin) not in PARENTS[Answer]:
+        apply_answers([instance], sign=-1)
+
+
+@receiver(post_delete, sender=Form)
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Answer)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # The changes feed implies the rows deleted along with a parent from its tombstone
+    if _origin_model(origin) not in PARENTS[sender]:
+        Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
+
+
+@receiver(post_migrate)
+def repair_answer_search(sender, using, **kwargs):
+    if sender.name == 'forms':
+        repair_search_index(connections[using])
+
+
+@receiver(connection_created)
+def instrument_queries(sender, connection, **kwargs):
+    if settings.FORMS_PROFILING:
+        instrument_connection(connection)
@@ -0,0 +1,105 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?expand=`` on read requests.
+
+``?fields=id,text`` limits a response to the named fields. Related objects
+in a sparse response are plain ids, and ``?expand=form`` nests them. It also
+adds reverse relations such as a form's ``questions``. Responses without
+``?fields=`` keep their full shape. ``SparseQuerysetMixin`` makes the
+viewsets load only the requested columns and join only expanded relations.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def requested(request, name):
+    """The comma separated names in query parameter ``name``, or ``None`` if it is absent."""
+    if request is None or request.method not in READ_METHODS:
+        return None
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin applying ``?fields=`` and ``?expand=`` of the request in the context.
+
+    ``expandable`` maps field names to a callable returning the nested
+    serializer of that relation. Only the outermost serializer of a response
+    looks at the query, so nested ones keep all of their fields.
+    """
+    expandable = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        request = self.context.get('request')
+        wanted = requested(request, 'fields')
+        expand = requested(request, 'expand') or set()
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        for name, nested in self.expandable.items():
+            if name in expand and (wanted is None or name in wanted):
+                fields[name] = nested()
+            elif name in fields and wanted is not None:
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return fields
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+def sparse_queryset(queryset, serializer_class, request):
+    """
+    Restrict ``queryset`` to what a sparse response of ``serializer_class`` shows.
+
+    Only the requested columns and the primary key are loaded, and related
+    rows are joined or prefetched only when they are expanded. Querysets of
+    full responses are returned as they are.
+    """
+    wanted = requested(request, 'fields')
+    expand = requested(request, 'expand') or set()
+    opts = queryset.model._meta
+    expanded = [
+        name for name in getattr(serializer_class, 'expandable', {})
+        if name in expand and (wanted is None or name in wanted)
+    ]
+    if wanted is not None:
+        columns = {opts.pk.name}
+        for name in wanted:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(name)
+        queryset = queryset.select_related(None).only(*columns)
+    for name in expanded:
+        field = opts.get_field(name)
+        if field.many_to_one or field.one_to_one:
+            queryset = queryset.select_related(name)
+        else:
+            queryset = queryset.prefetch_related(name)
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """
+    Viewset mixin loading only what ``?fields=`` and ``?expand=`` ask for.
+
+    It applies to ``list`` and ``retrieve``; in other actions the parameters
+    may describe something else, such as the questions of a form.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        return sparse_queryset(queryset, self.get_serializer_class(), self.request)
@@ -0,0 +1,201 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+
+from .archive import iter_archived
+from .models import Answer, Form, QuestionStats
+
+STATS_FIELDS = [
+    'answer_count', 'filled_count', 'numeric_count', 'numeric_sum', 'numeric_min', 'numeric_max', 'histogram'
+]
+
+
+def histogram_bins():
+    return getattr(settings, 'FORMS_STATS_HISTOGRAM_BINS', 10)
+
+
+def histogram_edges(question):
+    """Bin edges for a number question, or ``None`` when it has no bounds to split."""
+    if question.question_type != 'number' or question.min_value is None or question.max_value is None:
+        return None
+    bins = histogram_bins()
+    width = (question.max_value - question.min_value) / bins
+    return [question.min_value + width * i for i in range(bins + 1)]
+
+
+def _histogram_index(question, value):
+    low, high = question.min_value, question.max_value
+    if high == low:
+        return 0
+    bins = histogram_bins()
+    index = int((value - low) / (high - low) * bins)
+    return min(max(index, 0), bins - 1)
+
+
+def record_answer(stats, question, text_answer, numeric_answer, email_answer, sign=1):
+    """
+    Add (``sign=1``) or remove (``sign=-1``) one answer from ``stats`` in memory.
+
+    Returns ``True`` when removing the answer may have invalidated the stored
+    minimum or maximum, which can only be recomputed from the answers.
+    """
+    stats.answer_count += sign
+    if text_answer or email_answer or numeric_answer is not None:
+        stats.filled_count += sign
+
+    if numeric_answer is None:
+        return False
+
+    stats.numeric_count += sign
+    stats.numeric_sum += sign * numeric_answer
+
+    if histogram_edges(question) is not None:
+        if len(stats.histogram) != histogram_bins():
+            stats.histogram = [0] * histogram_bins()
+        stats.histogram[_histogram_index(question, numeric_answer)] += sign
+
+    if sign > 0:
+        if stats.numeric_min is None or numeric_answer < stats.numeric_min:
+            stats.numeric_min = numeric_answer
+        if stats.numeric_max is None or numeric_answer > stats.numeric_max:
+            stats.numeric_max = numeric_answer
+        return False
+    return numeric_answer in (stats.numeric_min, stats.numeric_max)
+
+
+def apply_answers(answers, sign=1):
+    """
+    Fold a batch of created (or deleted) answers into the summary table.
+
+    The cost is a fixed handful of queries per batch: one insert for missing
+    summary rows, one locking read and one bulk update. Removing the current
+    minimum or maximum of a question re-aggregates that question's answers,
+    archived ones included.
+    """
+    by_question = defaultdict(list)
+    for answer in answers:
+        by_question[answer.question_id].append(answer)
+    if not by_question:
+        return
+
+    with transaction.atomic(savepoint=False):
+        QuestionStats.objects.bulk_create(
+            [QuestionStats(question_id=question_id) for question_id in by_question],
+            ignore_conflicts=True
+        )
+        rows = list(
+            QuestionStats.objects.select_for_update().select_related('question').filter(question_id__in=by_question)
+        )
+        stale = []
+        for stats in rows:
+            for answer in by_question[stats.question_id]:
+                if record_answer(stats, stats.question, answer.text_answer, answer.numeric_answer,
+                                 answer.email_answer, sign):
+                    stale.append(stats)
+
+        for stats in set(stale):
+            if Form.objects.filter(pk=stats.question.form_id, archived_responses__gt=0).exists():
+                # Archived answers are out of the table, compute_stats reads them as well
+                computed = compute_stats([stats.question])[stats.question_id]
+                bounds = {'numeric_min': computed.numeric_min, 'numeric_max': computed.numeric_max}
+            else:
+                bounds = Answer.objects.filter(question_id=stats.question_id).aggregate(
+                    numeric_min=Min('numeric_answer'), numeric_max=Max('numeric_answer')
+                )
+            stats.numeric_min = bounds['numeric_min']
+            stats.numeric_max = bounds['numeric_max']
+
+        QuestionStats.objects.bulk_update(rows, STATS_FIELDS)
+
+
+def compute_stats(questions):
+    """Recompute the summaries of ``questions`` from scratch by streaming their answers, archived ones included."""
+    questions = {question.id: question for question in questions}
+    computed = {question_id: QuestionStats(question_id=question_id) for question_id in questions}
+    answers = (
+        Answer.objects
+        .filter(question_id__in=questions)
+        .values_list('question_id', 'text_answer', 'numeric_answer', 'email_answer')
+        .iterator(chunk_size=2000)
+    )
+    for question_id, *values in answers:
+        record_answer(computed[question_id], questions[question_id], *values)
+    for submission in iter_archived({question.form_id for question in questions.values()}):
+        for question_id, *values in submission['answers']:
+            if question_id in computed:
+                record_answer(computed[question_id], questions[question_id], *values)
+    return computed
+
+
+def stats_differ(stored, computed):
+    """Names of the summary fields where ``stored`` drifted from ``computed``."""
+    drift = []
+    for field in STATS_FIELDS:
+        expected, actual = getattr(computed, field), getattr(stored, field)
+        if isinstance(expected, float) and isinstance(actual, float):
+            if not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9):
+                drift.append(field)
+        elif expected != actual:
+            drift.append(field)
+    return drift
+
+
+def form_stats(form):
+    """Serialize the summaries of every question in ``form`` without touching the answers table."""
+    questions = list(form.questions.select_related('stats').order_by('id'))
+    summaries = []
+    for question in questions:
+        try:
+            summaries.append((question, question.stats))
+        except QuestionStats.DoesNotExist:
+            summaries.append((question, QuestionStats(question=question)))
+
+    # Counted over the (form, created_at) index
+    responses = form.submissions.count() + form.archived_responses
+
+    result = []
+    for question, stats in summaries:
+        entry = {
+            'question': question.id,
+            'text': question.text,
+            'question_type': question.question_type,
+            'answer_count': stats.answer_count,
+            'fill_rate': stats.filled_count / responses if responses else None,
+        }
+        if question.question_type == 'number':
+            entry.update({
+                'min': stats.numeric_min,
+                'max': stats.numeric_max,
+                'mean': stats.numeric_sum / stats.numeric_count if stats.numeric_count else None,
+                'histogram': {
+                    'edges': histogram_edges(question),
+                    'counts': stats.histogram or None,
+                } if histogram_edges(question) is not None else None,
+            })
+        result.append(entry)
+    return {'form': form.id, 'responses': responses, 'questions': result}
+
+
+def rebuild_stats(questions, dry_run=False):
+    """
+    Recompute the summaries of ``questions`` and store them unless ``dry_run``.
+
+    Returns the stored summaries that drifted from the answers, as
+    ``(question_id, fields)`` pairs.
+    """
+    computed = compute_stats(questions)
+    with transaction.atomic():
+        stored = QuestionStats.objects.select_for_update().in_bulk(list(computed))
+        drift = []
+        for question_id, stats in computed.items():
+            # A missing row reads as an empty summary, see form_stats
+            fields = stats_differ(stored.get(question_id, QuestionStats(question_id=question_id)), stats)
+            if fields:
+                drift.append((question_id, fields))
+        if not dry_run:
+            QuestionStats.objects.filter(question_id__in=computed).delete()
+            QuestionStats.objects.bulk_create(computed.values())
+    return drift
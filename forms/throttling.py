@@ -0,0 +1,194 @@
+"""
+Token bucket throttling of answer submissions.
+
+Every client and every form has a bucket holding up to the number of
+requests of its rate in ``FORMS_THROTTLE_RATES``, refilled evenly over the
+rate's period. A submission takes one token; an empty bucket answers 429
+with the seconds until the next token in ``Retry-After``. The buckets live
+in the store named by ``FORMS_THROTTLE_STORE``, which async views reach
+through ``atake`` so a cache backed by the database works there too.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """``'60/min'`` as ``(60, 60)``: the bucket size and the seconds it takes to refill."""
+    if not rate:
+        return None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+def _refill(tokens, updated, now, capacity, period):
+    return min(capacity, tokens + (now - updated) * capacity / period)
+
+
+def _take(bucket, now, capacity, period):
+    """The wait before a token of ``bucket``, a ``(tokens, updated)`` pair, and the bucket afterwards."""
+    tokens, updated = bucket
+    tokens = _refill(tokens, updated, now, capacity, period)
+    wait = 0 if tokens >= 1 else (1 - tokens) * period / capacity
+    return wait, (tokens - 1 if wait == 0 else tokens, now)
+
+
+class LocalBucketStore:
+    """
+    Buckets in the memory of this process, so each worker throttles on its own.
+
+    The least recently used buckets are dropped beyond ``max_buckets``; a
+    dropped bucket comes back full.
+    """
+
+    def __init__(self, max_buckets=100_000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        """Take a token from bucket ``key``. Returns 0, or the seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            wait, self._buckets[key] = _take(self._buckets.pop(key, (capacity, now)), now, capacity, period)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    async def atake(self, key, capacity, period):
+        # Memory only, nothing to wait for
+        return self.take(key, capacity, period)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in the Django cache, shared by every worker using that cache.
+
+    Reading and writing a bucket are two cache calls, so concurrent
+    requests of one client may both get the last token.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, period):
+        now = time.time()
+        key = f'forms:throttle:{key}'
+        wait, bucket = _take(self.cache.get(key, (capacity, now)), now, capacity, period)
+        # A bucket left alone for a whole period is full again, like a missing one
+        self.cache.set(key, bucket, period)
+        return wait
+
+    async def atake(self, key, capacity, period):
+        """Async counterpart of ``take``, for backends such as ``DatabaseCache`` that block."""
+        now = time.time()
+        key = f'forms:throttle:{key}'
+        wait, bucket = _take(await self.cache.aget(key, (capacity, now)), now, capacity, period)
+        await self.cache.aset(key, bucket, period)
+        return wait
+
+
+@lru_cache(maxsize=None)
+def get_bucket_store(path):
+    return import_string(path)()
+
+
+class BucketThrottle(BaseThrottle):
+    """A DRF throttle taking a token from the bucket of ``scope`` and ``get_key``."""
+    scope = None
+
+    def get_key(self, request, data):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        return self.allow(request, request.data)
+
+    def bucket(self, request, data):
+        """The key and rate of the bucket ``data`` takes a token from, or ``None`` when it is not limited."""
+        rate = parse_rate(settings.FORMS_THROTTLE_RATES.get(self.scope))
+        key = self.get_key(request, data)
+        if rate is None or key is None:
+            return None
+        return f'{self.scope}:{key}', rate
+
+    def allow(self, request, data):
+        self.delay = 0
+        bucket = self.bucket(request, data)
+        if bucket is not None:
+            key, rate = bucket
+            self.delay = get_bucket_store(settings.FORMS_THROTTLE_STORE).take(key, *rate)
+        return self.delay == 0
+
+    async def aallow(self, request, data):
+        """Async counterpart of ``allow``."""
+        self.delay = 0
+        bucket = self.bucket(request, data)
+        if bucket is not None:
+            key, rate = bucket
+            self.delay = await get_bucket_store(settings.FORMS_THROTTLE_STORE).atake(key, *rate)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
+
+
+class ClientThrottle(BucketThrottle):
+    """Submissions per client address."""
+    scope = 'client'
+
+    def get_key(self, request, data):
+        return self.get_ident(request)
+
+
+class FormThrottle(BucketThrottle):
+    """
+    Submissions per form, across all clients.
+
+    Single answers name only their question, so they are counted per
+    question rather than spending a query on its form.
+    """
+    scope = 'form'
+
+    def get_key(self, request, data):
+        if not hasattr(data, 'get'):
+            return None
+        for field in ('form', 'question'):
+            try:
+                return f'{field}:{int(data[field])}'
+            except (KeyError, TypeError, ValueError):
+                pass
+        # Not a valid submission, validation rejects it
+        return None
+
+
+SUBMISSION_THROTTLES = (ClientThrottle, FormThrottle)
+
+
+def submission_wait(request, data):
+    """Seconds the client has to wait before submitting ``data``, or 0."""
+    for throttle_class in SUBMISSION_THROTTLES:
+        throttle = throttle_class()
+        if not throttle.allow(request, data):
+            return throttle.wait()
+    return 0
+
+
+async def asubmission_wait(request, data):
+    """Async counterpart of ``submission_wait``."""
+    for throttle_class in SUBMISSION_THROTTLES:
+        throttle = throttle_class()
+        if not await throttle.aallow(request, data):
+            return throttle.wait()
+    return 0
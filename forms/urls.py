@@ -1,13 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FormViewSet, QuestionViewSet, AnswerViewSet
+from . import async_views
+from .views import (
+    FormViewSet, QuestionViewSet, AnswerViewSet, ChangeViewSet, FormVersionViewSet, ReceiptViewSet, SubmissionViewSet
+)
 
 router = DefaultRouter()
 router.register(r'forms', FormViewSet, basename='form')
 router.register(r'questions', QuestionViewSet, basename='question')
 router.register(r'answers', AnswerViewSet, basename='answer')
+router.register(r'receipts', ReceiptViewSet, basename='receipt')
+router.register(r'submissions', SubmissionViewSet, basename='submission')
+router.register(r'versions', FormVersionViewSet, basename='formversion')
+router.register(r'changes', ChangeViewSet, basename='change')
 
 urlpatterns = [
+    path('async/forms/<int:pk>/', async_views.form_definition, name='async-form-definition'),
+    path('async/answers/bulk/', async_views.submit_answers, name='async-answer-bulk'),
     path('', include(router.urls)),  # Include all routes from the router
 ]
 
@@ -0,0 +1,66 @@
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+
+
+class AnswerValidator:
+    """
+    The answer rules of one question, with its bounds resolved up front.
+
+    Validating an answer is then a handful of attribute reads and
+    comparisons, without branching on the question type again.
+    """
+    __slots__ = ('check', 'max_length', 'min_value', 'max_value')
+
+    def __init__(self, question_type, max_length, min_value, max_value):
+        self.check = {
+            'short_text': self._check_text,
+            'long_text': self._check_text,
+            'number': self._check_number,
+            'email': self._check_email,
+        }.get(question_type, self._check_nothing)
+        self.max_length = max_length
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def validate(self, text_answer, numeric_answer, email_answer):
+        """Raise ``ValidationError`` if the answer breaks the question's rules."""
+        if bool(text_answer) + bool(numeric_answer) + bool(email_answer) > 1:
+            raise ValidationError("Only one type of answer can be provided for a single question.")
+        self.check(text_answer, numeric_answer, email_answer)
+
+    def _check_text(self, text_answer, numeric_answer, email_answer):
+        if not text_answer:
+            raise ValidationError({'text_answer': 'This field is required for text type questions.'})
+        if self.max_length is not None and len(text_answer) > self.max_length:
+            raise ValidationError({'text_answer': f'Answer length cannot exceed {self.max_length} characters.'})
+
+    def _check_number(self, text_answer, numeric_answer, email_answer):
+        if numeric_answer is None:
+            raise ValidationError({'numeric_answer': 'This field is required for numeric type questions.'})
+        if self.min_value is not None and numeric_answer < self.min_value:
+            raise ValidationError({'numeric_answer': f'Answer must be greater than or equal to {self.min_value}.'})
+        if self.max_value is not None and numeric_answer > self.max_value:
+            raise ValidationError({'numeric_answer': f'Answer must be less than or equal to {self.max_value}.'})
+
+    def _check_email(self, text_answer, numeric_answer, email_answer):
+        if not email_answer:
+            raise ValidationError({'email_answer': 'This field is required for email type questions.'})
+
+    def _check_nothing(self, text_answer, numeric_answer, email_answer):
+        pass
+
+
+@lru_cache(maxsize=4096)
+def _compile(question_type, max_length, min_value, max_value):
+    return AnswerValidator(question_type, max_length, min_value, max_value)
+
+
+def get_validator(question):
+    """
+    Return the compiled validator of ``question``.
+
+    Validators are cached by the fields they are built from, so editing a
+    question picks up a new validator without any explicit invalidation.
+    """
+    return _compile(question.question_type, question.max_length, question.min_value, question.max_value)
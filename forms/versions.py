@@ -0,0 +1,81 @@
+"""
+Published form versions.
+
+``publish`` renders a form and its questions into the JSON document of a
+new ``FormVersion`` once, so serving it is a primary-key fetch that sends
+the stored text as is. The question rules in the document are what
+submissions to that version are validated against, whatever happened to
+the live questions since.
+"""
+import json
+
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .models import Form, FormVersion, Question
+
+# What a respondent sees of a question, including every rule its answers are validated with
+QUESTION_FIELDS = (
+    'id', 'text', 'required', 'question_type', 'max_length', 'min_value', 'max_value', 'allow_decimal'
+)
+
+
+def publish_version(form):
+    """Freeze the current state of ``form`` into its next version."""
+    with transaction.atomic():
+        # Serializes concurrent publishes of the same form
+        form = Form.objects.select_for_update().get(pk=form.pk)
+        last = form.versions.order_by('-number').values_list('number', flat=True).first() or 0
+        version = FormVersion.objects.create(form=form, number=last + 1, document='')
+        document = {
+            'id': version.id,
+            'number': version.number,
+            'published_at': version.published_at,
+            'form': {'id': form.id, 'title': form.title, 'created_at': form.created_at},
+            'questions': [
+                {field: getattr(question, field) for field in QUESTION_FIELDS}
+                for question in form.questions.order_by('id')
+            ],
+        }
+        version.document = JSONRenderer().render(document).decode()
+        version.save(update_fields=['document'])
+    return version
+
+
+def version_etag(version_id):
+    return f'"form-version-{version_id}"'
+
+
+def document_response(version_id, document, status=200, headers=None):
+    """The stored document as is, cacheable by anyone for as long as they like."""
+    return HttpResponse(document, status=status, content_type='application/json', headers={
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'ETag': version_etag(version_id),
+        **(headers or {}),
+    })
+
+
+def version_questions(version):
+    """
+    The questions of ``version`` as unsaved ``Question`` instances, by id.
+
+    They carry the rules as published, so ``get_validator`` and the
+    required check apply them without reading the live questions.
+    """
+    return {
+        question['id']: Question(form_id=version.form_id, **{field: question[field] for field in QUESTION_FIELDS})
+        for question in json.loads(version.document)['questions']
+    }
+
+
+def answered_question(question, submission):
+    """
+    ``question`` with the rules its answers in ``submission`` are validated by.
+
+    A submission to a published version follows the question as published,
+    or ``None`` when that version does not have it; any other, the live one.
+    """
+    if submission is None or submission.version_id is None:
+        return question
+    return version_questions(submission.version).get(question.id)
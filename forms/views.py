@@ -1,27 +1,275 @@
-from rest_framework import viewsets
+from django.db.models import Max, Prefetch
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from .models import Form, Question, Answer
-from .serializers import FormSerializer, QuestionSerializer, AnswerSerializer
+from rest_framework.settings import api_settings
+from .cache import cached_form_response
+from .changes import changes_since, decode_cursor
+from .conditional import ConditionalMixin, conditional_response, get_stamps
+from .exports import export_response
+from .idempotency import idempotent
+from .ingest import enqueue, queue_enabled, receipt_response
+from .models import Form, FormVersion, Question, Answer, QueuedSubmission, Submission
+from .pagination import ChangesPagination, CreatedAtCursorPagination, RankedPagination
+from .renderers import CSVRenderer, JSONLinesRenderer
+from .search import search_answers
+from .serializers import (
+    FormSerializer, FormDefinitionSerializer, QuestionSerializer, QuestionDefinitionSerializer, AnswerSerializer,
+    AnswerSearchResultSerializer, BulkAnswerSerializer, ChangeSerializer, FormVersionSerializer, ReceiptSerializer,
+    SubmissionSerializer
+)
+from .sparse import SparseQuerysetMixin, sparse_queryset
+from .stats import form_stats
+from .throttling import SUBMISSION_THROTTLES
+from .versions import document_response, publish_version, version_etag
 
 
-class FormViewSet(viewsets.ModelViewSet):
+def _datetime_param(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: 'Enter a valid ISO 8601 date and time.'})
+    return parsed
+
+
+class FormViewSet(ConditionalMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Form.objects.all()
     serializer_class = FormSerializer
+    # The form caches are keyed on the id, so 01 must not reach them as a different form
+    lookup_value_regex = r'\d+'
+    # Forms may be listed with their questions expanded
+    stamps = ('form', 'question')
+    # GETs here, including the stats and export actions, may be served by a read replica
+    replica_reads = True
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            return self.get_serializer(self.get_object()).data
+
+        return cached_form_response(request, int(kwargs['pk']), 'detail', build)
 
     @action(detail=True, methods=['get'])
     def questions(self, request, pk=None):
+        def build():
+            form = self.get_object()
+            # The related manager hands every question the already loaded form,
+            # so the nested FormSerializer does not query it again
+            questions = sparse_queryset(form.questions.all(), QuestionSerializer, request)
+            page = self.paginate_queryset(questions)
+            serializer = QuestionSerializer(page, many=True, context=self.get_serializer_context())
+            return self.get_paginated_response(serializer.data).data
+
+        return cached_form_response(request, int(pk), 'questions', build)
+
+    @action(detail=True, methods=['get'], renderer_classes=[CSVRenderer, JSONLinesRenderer])
+    def export(self, request, pk=None):
+        """Stream every response to the form as CSV (default) or JSON Lines."""
+        form = self.get_object()
+        return export_response(form, request.accepted_renderer.format)
+
+    @action(detail=True, methods=['get'], pagination_class=CreatedAtCursorPagination)
+    def submissions(self, request, pk=None):
+        """The form's submissions with their answers, oldest first, optionally between ``since`` and ``until``."""
+        def build():
+            page = self.paginate_queryset(submissions.prefetch_related(
+                Prefetch('answers', queryset=Answer.objects.order_by('question_id'))
+            ))
+            return self.get_paginated_response(SubmissionSerializer(page, many=True).data)
+
+        form = self.get_object()
+        submissions = form.submissions.all()
+        since = _datetime_param(request, 'since')
+        if since is not None:
+            submissions = submissions.filter(created_at__gte=since)
+        until = _datetime_param(request, 'until')
+        if until is not None:
+            submissions = submissions.filter(created_at__lt=until)
+        # Submissions are only ever added, or deleted with their answers
+        last_pk = submissions.aggregate(last=Max('pk'))['last']
+        stamps = get_stamps(('answer',))
+        return conditional_response(request, (stamps, last_pk), build, stamps[0])
+
+    @action(detail=True, methods=['get'], url_path='answers/search')
+    def search_answers(self, request, pk=None):
+        """Full-text search over the form's text answers, best match first."""
+        form = self.get_object()
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        paginator = RankedPagination()
+        answers = paginator.paginate(lambda limit, offset: search_answers(form, text, limit, offset), request)
+        return paginator.get_paginated_response(AnswerSearchResultSerializer(answers, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Per-question counts, fill rates and numeric summaries of the form's answers."""
+        return Response(form_stats(self.get_object()))
+
+    @action(detail=False, methods=['post'], url_path='import', serializer_class=FormDefinitionSerializer)
+    def import_form(self, request):
+        """Create a form together with its ordered questions from one definition."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], serializer_class=FormDefinitionSerializer)
+    def clone(self, request, pk=None):
+        """Copy the form and all of its questions into a new form, optionally under a new ``title``."""
+        if not isinstance(request.data, dict):
+            # Same error a serializer gives for a body that is not an object
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Invalid data. Expected a dictionary, but got {type(request.data).__name__}.'
+            ]})
+        form = self.get_object()
+        fields = [field for field in QuestionDefinitionSerializer.Meta.fields if field != 'id']
+        serializer = self.get_serializer(data={
+            'title': request.data.get('title', f"Copy of {form.title}"[:100]),
+            'questions': list(form.questions.order_by('id').values(*fields)),
+        })
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """Stop accepting answers, so the form's responses can be archived with ``manage.py archive_forms``."""
         form = self.get_object()
-        questions = form.questions.all()
-        serializer = QuestionSerializer(questions, many=True)
-        return Response(serializer.data)
+        if form.closed_at is None:
+            form.closed_at = timezone.now()
+            form.save(update_fields=['closed_at', 'updated_at'])
+        return Response(self.get_serializer(form).data)
 
+    @action(detail=True, methods=['post'])
+    def publish(self, request, pk=None):
+        """Freeze the form and its questions into a new immutable version."""
+        version = publish_version(self.get_object())
+        location = request.build_absolute_uri(reverse('formversion-detail', kwargs={'pk': version.id}))
+        return document_response(version.id, version.document, status=status.HTTP_201_CREATED,
+                                 headers={'Location': location})
 
-class QuestionViewSet(viewsets.ModelViewSet):
-    queryset = Question.objects.all()
+    @action(detail=True, methods=['get'])
+    def published(self, request, pk=None):
+        """Redirect to the latest published version of the form."""
+        version_id = (
+            FormVersion.objects.filter(form_id=pk).order_by('-number').values_list('id', flat=True).first()
+        )
+        if version_id is None:
+            raise NotFound('This form has not been published.')
+        location = request.build_absolute_uri(reverse('formversion-detail', kwargs={'pk': version_id}))
+        # The next publish moves the redirect, so clients must check back
+        return Response(status=status.HTTP_302_FOUND, headers={'Location': location, 'Cache-Control': 'no-cache'})
+
+
+class QuestionViewSet(ConditionalMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
+    # QuestionSerializer nests the form, so join it instead of one query per row
+    queryset = Question.objects.select_related('form')
     serializer_class = QuestionSerializer
+    stamps = ('question', 'form')
+    replica_reads = True
 
 
-class AnswerViewSet(viewsets.ModelViewSet):
+class AnswerViewSet(ConditionalMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
+    stamps = ('answer', 'question')
+
+    def get_throttles(self):
+        if self.action in ('create', 'bulk'):
+            return [throttle() for throttle in SUBMISSION_THROTTLES]
+        return super().get_throttles()
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        if not queue_enabled():
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        submission = data.get('submission')
+        return receipt_response(request, enqueue(
+            data['question'].form_id, [data], submission_id=submission.id if submission else None
+        ))
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def bulk(self, request):
+        """Submit every answer of a form in a single request."""
+        serializer = BulkAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if queue_enabled():
+            data = serializer.validated_data
+            version = data.get('version')
+            return receipt_response(request, enqueue(
+                data['form'].id, data['answers'], data.get('respondent', ''), version_id=version and version.id
+            ))
+        answers = serializer.save()
+        return Response(AnswerSerializer(answers, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class ChangeViewSet(viewsets.ViewSet):
+    """Forms, questions and answers changed or deleted since the ``since`` cursor, for incremental syncs."""
+
+    def list(self, request):
+        since = request.query_params.get('since')
+        try:
+            position = decode_cursor(since) if since else None
+        except ValueError:
+            raise ValidationError({'since': 'Enter a cursor of this feed or a date and time.'})
+        paginator = ChangesPagination()
+        changes = paginator.paginate(lambda limit: changes_since(position, limit), request)
+        return paginator.get_paginated_response(ChangeSerializer(changes, many=True).data)
+
+
+class ReceiptViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Status of a submission accepted in queue ingestion mode."""
+    queryset = QueuedSubmission.objects.all()
+    serializer_class = ReceiptSerializer
+    lookup_field = 'receipt'
+
+
+class FormVersionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Published form versions, served from their stored document."""
+    queryset = FormVersion.objects.all()
+    serializer_class = FormVersionSerializer
+    lookup_value_regex = r'\d+'
+    replica_reads = True
+
+    def retrieve(self, request, *args, **kwargs):
+        # Versions never change, so a client holding the ETag is always fresh
+        not_modified = get_conditional_response(request, etag=version_etag(kwargs['pk']))
+        if not_modified is not None:
+            return not_modified
+        document = get_object_or_404(self.get_queryset().values_list('document', flat=True), pk=kwargs['pk'])
+        return document_response(kwargs['pk'], document)
+
+
+class SubmissionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    queryset = Submission.objects.all()
+    serializer_class = SubmissionSerializer
+    lookup_value_regex = r'\d+'
+
+    def retrieve(self, request, *args, **kwargs):
+        def build():
+            # One query: the answers carry their submission along
+            answers = list(
+                Answer.objects.filter(submission_id=kwargs['pk']).select_related('submission').order_by('question_id')
+            )
+            if answers:
+                submission = answers[0].submission
+            else:
+                submission = get_object_or_404(self.get_queryset(), pk=kwargs['pk'])
+            submission._prefetched_objects_cache = {'answers': answers}
+            return Response(self.get_serializer(submission).data)
+
+        # The answers of a submission are written with it and then only changed one by one
+        stamps = get_stamps(('answer',))
+        return conditional_response(request, stamps, build, stamps[0], last_modified=stamps[0] // 1_000_000_000)